@@ -1,6 +1,7 @@
 import sys
 import os
 import configparser
+import multiprocessing
 from PyQt5 import QtWidgets
 from gui import MainWindow
 from fileInput import xlsm_to_dataframe, filter_inv_df, filter_po_df
@@ -44,7 +45,25 @@ def main():
             "order_label": "No Commande"
         }
     if not config.has_section("Optimization"):
-        config["Optimization"] = {"algorithm": "MILP"}
+        config["Optimization"] = {
+            "algorithm": "MILP",
+            "workers": "0",
+            "sa_batch_size": "0",
+            "sa_batch_selection": "boltzmann",
+            "time_limit": "0",
+            "stall_iterations": "0",
+            "stall_restarts": "0",
+            "sa_gap_target": "0",
+            "milp_gap_rel": "0",
+            "milp_threads": "0",
+            "milp_warm_start": "true",
+            "backend": "auto",
+            "decompose_by_paper": "true",
+            "portfolio_engines": "SA,MILP,COLGEN,GILMORE_GOMORY",
+            "trace_file": "",
+            "profile": "false",
+            "profile_dir": "profiles"
+        }
         
 
     # Create empty DataFrames as placeholders
@@ -58,4 +77,6 @@ def main():
     sys.exit(app.exec_())
 
 if __name__ == "__main__":
+    # Required for the SA process pool when running as a frozen executable.
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -6,7 +6,8 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    # pandas imports pyarrow dynamically for the Feather cache (see fileInput).
+    hiddenimports=['pyarrow', 'pyarrow.feather'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -0,0 +1,334 @@
+import math
+import os
+import re
+import tempfile
+import warnings
+import numpy as np
+
+BACKENDS = ("auto", "highs", "scipy", "pulp")
+
+########################################
+# Sparse Model
+########################################
+class SparseModel:
+    """
+    Solver-neutral linear model
+
+        min  cost . x
+        s.t. row_lower <= A x <= row_upper
+             lower <= x <= upper, x integer where `integer` is set
+
+    with A stored as coordinate (row, col, value) triplets. Variables and rows
+    are added in blocks of arrays, so models can be built without a Python loop
+    per coefficient.
+    """
+
+    def __init__(self, name="model"):
+        self.name = name
+        self.num_vars = 0
+        self.num_rows = 0
+        self._vars = []     # (cost, lower, upper, integer) arrays
+        self._entries = []  # (rows, cols, vals) arrays
+        self._rows = []     # (row_lower, row_upper) arrays
+
+    def add_vars(self, cost, lower=0.0, upper=math.inf, integer=False):
+        """Add len(cost) variables; returns the index of the first one."""
+        cost = np.asarray(cost, dtype=float).ravel()
+        n = len(cost)
+        self._vars.append((cost,
+                           np.broadcast_to(np.asarray(lower, dtype=float), n),
+                           np.broadcast_to(np.asarray(upper, dtype=float), n),
+                           np.broadcast_to(np.asarray(integer, dtype=bool), n)))
+        first = self.num_vars
+        self.num_vars += n
+        return first
+
+    def add_rows(self, rows, cols, vals, lower, upper, count=None):
+        """
+        Add `count` rows (default: one per bound) whose coefficients are given as
+        triplets with `rows` numbered from 0 within this block. Returns the index
+        of the first row.
+        """
+        lower = np.atleast_1d(np.asarray(lower, dtype=float))
+        upper = np.atleast_1d(np.asarray(upper, dtype=float))
+        count = max(len(lower), len(upper)) if count is None else count
+        first = self.num_rows
+        self._entries.append((np.asarray(rows, dtype=np.int64) + first,
+                              np.asarray(cols, dtype=np.int64),
+                              np.asarray(vals, dtype=float)))
+        self._rows.append((np.broadcast_to(lower, count), np.broadcast_to(upper, count)))
+        self.num_rows += count
+        return first
+
+    def arrays(self):
+        """(cost, lower, upper, integer, rows, cols, vals, row_lower, row_upper) as flat arrays."""
+        def cat(parts, dtype):
+            return np.concatenate(parts).astype(dtype) if parts else np.zeros(0, dtype=dtype)
+        return (cat([v[0] for v in self._vars], float), cat([v[1] for v in self._vars], float),
+                cat([v[2] for v in self._vars], float), cat([v[3] for v in self._vars], bool),
+                cat([e[0] for e in self._entries], np.int64), cat([e[1] for e in self._entries], np.int64),
+                cat([e[2] for e in self._entries], float),
+                cat([r[0] for r in self._rows], float), cat([r[1] for r in self._rows], float))
+
+########################################
+# Dispatch
+########################################
+def _available(backend):
+    try:
+        if backend == "highs":
+            import highspy  # noqa: F401
+        elif backend == "scipy":
+            from scipy.optimize import milp  # noqa: F401
+        elif backend == "pulp":
+            import pulp  # noqa: F401
+        else:
+            return False
+    except ImportError:
+        return False
+    return True
+
+def resolve_backend(backend="auto"):
+    """
+    Backend that will actually run: "auto" prefers the in-process HiGHS bindings,
+    then SciPy's HiGHS-based milp, then PuLP/CBC. A named backend that is not
+    installed falls back to PuLP/CBC.
+    """
+    backend = (backend or "auto").lower()
+    if backend == "auto":
+        for candidate in ("highs", "scipy"):
+            if _available(candidate):
+                return candidate
+        return "pulp"
+    if backend != "pulp" and not _available(backend):
+        print(f"Solver backend '{backend}' is not installed, using PuLP/CBC.")
+        return "pulp"
+    return backend
+
+def solve_model(model, backend="auto", integer=True, time_limit=None, gap_rel=None, gap_abs=None,
+                threads=None, warm_start=None, duals=False):
+    """
+    Solve a SparseModel. With `integer` False the integrality flags are ignored and
+    the LP relaxation is solved; `duals` then also returns the row duals (reduced
+    cost of column j = cost_j - sum_i dual_i * A_ij).
+
+    `warm_start` is a full vector of starting values. HiGHS starts from it.
+    SciPy and CBC return it instead of their own plan when it is better.
+    SciPy ignores `threads` and `gap_abs`.
+
+    Returns a dict with:
+      backend, status, x (None without a solution), objective, best_bound, gap,
+      row_duals (None unless requested for an LP).
+    """
+    backend = resolve_backend(backend)
+    solver = {"highs": _solve_highs, "scipy": _solve_scipy, "pulp": _solve_pulp}[backend]
+    result = solver(model, integer, time_limit, gap_rel, gap_abs, threads, warm_start, duals)
+    result['backend'] = backend
+    if backend in ("scipy", "pulp") and warm_start is not None:
+        _keep_warm_start(model, result, warm_start)
+    for key in ('objective', 'best_bound'):
+        if result[key] is not None:
+            result[key] = float(result[key])
+    if result['objective'] is not None and result['best_bound'] is not None:
+        result['gap'] = abs(result['objective'] - result['best_bound']) / max(abs(result['objective']), 1e-9)
+    return result
+
+def _keep_warm_start(model, result, warm_start, tol=1e-6):
+    """
+    For backends that do not start from the warm start: return the starting point
+    instead of the solver's solution when it is feasible and better (or the solver
+    found none). CBC is given no MIP start, as it then skips the root heuristics
+    that find most of its good plans and tends to stop at the start itself.
+    """
+    cost, lower, upper, _, rows, cols, vals, row_lower, row_upper = model.arrays()
+    start = np.asarray(warm_start, dtype=float)
+    activity = np.bincount(rows, weights=vals * start[cols], minlength=model.num_rows)
+    feasible = (np.all(start >= lower - tol) and np.all(start <= upper + tol)
+                and np.all(activity >= row_lower - tol) and np.all(activity <= row_upper + tol))
+    objective = float(cost @ start)
+    if feasible and (result['objective'] is None or objective < result['objective'] - tol):
+        result['x'] = start
+        result['objective'] = objective
+        result['status'] += " (warm start kept)"
+
+def _result(status, x=None, objective=None, best_bound=None, row_duals=None):
+    return {'status': status, 'x': x, 'objective': objective, 'best_bound': best_bound,
+            'gap': None, 'row_duals': row_duals}
+
+########################################
+# HiGHS (highspy)
+########################################
+def _csc(num_vars, rows, cols, vals):
+    """Column-wise compressed arrays (start, index, value) of the COO triplets."""
+    order = np.lexsort((rows, cols))
+    start = np.zeros(num_vars + 1, dtype=np.int32)
+    np.cumsum(np.bincount(cols, minlength=num_vars), out=start[1:])
+    return start, rows[order].astype(np.int32), vals[order]
+
+def _solve_highs(model, integer, time_limit, gap_rel, gap_abs, threads, warm_start, duals):
+    import highspy
+    cost, lower, upper, is_int, rows, cols, vals, row_lower, row_upper = model.arrays()
+    lp = highspy.HighsLp()
+    lp.num_col_ = model.num_vars
+    lp.num_row_ = model.num_rows
+    lp.col_cost_ = cost
+    lp.col_lower_ = lower
+    lp.col_upper_ = upper
+    lp.row_lower_ = row_lower
+    lp.row_upper_ = row_upper
+    lp.a_matrix_.format_ = highspy.MatrixFormat.kColwise
+    lp.a_matrix_.start_, lp.a_matrix_.index_, lp.a_matrix_.value_ = _csc(model.num_vars, rows, cols, vals)
+    mip = integer and is_int.any()
+    if mip:
+        lp.integrality_ = [highspy.HighsVarType.kInteger if flag else highspy.HighsVarType.kContinuous
+                           for flag in is_int]
+
+    h = highspy.Highs()
+    h.setOptionValue("output_flag", False)
+    if time_limit is not None:
+        h.setOptionValue("time_limit", float(time_limit))
+    if gap_rel is not None:
+        h.setOptionValue("mip_rel_gap", float(gap_rel))
+    if gap_abs is not None:
+        h.setOptionValue("mip_abs_gap", float(gap_abs))
+    if threads:
+        h.setOptionValue("threads", int(threads))
+    h.passModel(lp)
+    if mip and warm_start is not None:
+        start = highspy.HighsSolution()
+        start.col_value = list(np.asarray(warm_start, dtype=float))
+        h.setSolution(start)
+    h.run()
+
+    status = h.modelStatusToString(h.getModelStatus())
+    info = h.getInfo()
+    if int(info.primal_solution_status) != 2:  # 2 = feasible; anything else has no solution
+        return _result(status, best_bound=info.mip_dual_bound if mip else None)
+    solution = h.getSolution()
+    return _result(status, x=np.array(solution.col_value), objective=info.objective_function_value,
+                   best_bound=info.mip_dual_bound if mip else info.objective_function_value,
+                   row_duals=np.array(solution.row_dual) if duals and not mip else None)
+
+########################################
+# SciPy (HiGHS inside scipy.optimize)
+########################################
+def _solve_scipy(model, integer, time_limit, gap_rel, gap_abs, threads, warm_start, duals):
+    from scipy.optimize import milp, linprog, Bounds, LinearConstraint
+    from scipy.sparse import coo_matrix, vstack
+    cost, lower, upper, is_int, rows, cols, vals, row_lower, row_upper = model.arrays()
+    A = coo_matrix((vals, (rows, cols)), shape=(model.num_rows, model.num_vars)).tocsr()
+
+    if integer and is_int.any():
+        options = {"disp": False}
+        if time_limit is not None:
+            options["time_limit"] = float(time_limit)
+        if gap_rel is not None:
+            options["mip_rel_gap"] = float(gap_rel)
+        res = milp(cost, integrality=is_int.astype(int), bounds=Bounds(lower, upper),
+                   constraints=LinearConstraint(A, row_lower, row_upper), options=options)
+        bound = getattr(res, "mip_dual_bound", None)
+        if res.x is None:
+            return _result(res.message, best_bound=bound)
+        return _result(res.message, x=res.x, objective=res.fun, best_bound=bound)
+
+    # linprog takes equality and <= rows separately; >= rows are negated.
+    eq = row_lower == row_upper
+    up = ~eq & np.isfinite(row_upper)
+    lo = ~eq & np.isfinite(row_lower)
+    has_ub = up.any() or lo.any()
+    A_ub = vstack([A[up], -A[lo]]).tocsr() if has_ub else None
+    b_ub = np.concatenate([row_upper[up], -row_lower[lo]]) if has_ub else None
+    options = {"disp": False}
+    if time_limit is not None:
+        options["time_limit"] = float(time_limit)
+    res = linprog(cost, A_ub=A_ub, b_ub=b_ub,
+                  A_eq=A[eq] if eq.any() else None, b_eq=row_lower[eq] if eq.any() else None,
+                  bounds=np.column_stack([lower, upper]), method="highs", options=options)
+    if res.x is None:
+        return _result(res.message)
+    row_duals = None
+    if duals:
+        row_duals = np.zeros(model.num_rows)
+        if eq.any():
+            row_duals[eq] = res.eqlin.marginals
+        n_up = int(up.sum())
+        if has_ub:
+            row_duals[up] += res.ineqlin.marginals[:n_up]
+            row_duals[lo] -= res.ineqlin.marginals[n_up:]
+    return _result(res.message, x=res.x, objective=res.fun, best_bound=res.fun, row_duals=row_duals)
+
+########################################
+# PuLP / CBC (command-line fallback)
+########################################
+def _solve_pulp(model, integer, time_limit, gap_rel, gap_abs, threads, warm_start, duals):
+    import pulp
+    cost, lower, upper, is_int, rows, cols, vals, row_lower, row_upper = model.arrays()
+    prob = pulp.LpProblem(model.name, pulp.LpMinimize)
+    x = [pulp.LpVariable(f"x_{j}",
+                         lowBound=None if math.isinf(lower[j]) else lower[j],
+                         upBound=None if math.isinf(upper[j]) else upper[j],
+                         cat="Integer" if integer and is_int[j] else "Continuous")
+         for j in range(model.num_vars)]
+    prob += pulp.LpAffineExpression([(x[j], cost[j]) for j in np.flatnonzero(cost)])
+
+    order = np.argsort(rows, kind="stable")
+    bounds = np.searchsorted(rows[order], np.arange(model.num_rows + 1))
+    names = []  # (row, constraint name, sign of its dual)
+    for i in range(model.num_rows):
+        entries = order[bounds[i]:bounds[i + 1]]
+        expr = pulp.LpAffineExpression([(x[cols[k]], vals[k]) for k in entries])
+        if row_lower[i] == row_upper[i]:
+            prob += pulp.LpConstraint(expr, pulp.LpConstraintEQ, f"r{i}", row_lower[i])
+            names.append((i, f"r{i}"))
+            continue
+        if np.isfinite(row_upper[i]):
+            prob += pulp.LpConstraint(expr, pulp.LpConstraintLE, f"r{i}_up", row_upper[i])
+            names.append((i, f"r{i}_up"))
+        if np.isfinite(row_lower[i]):
+            prob += pulp.LpConstraint(expr, pulp.LpConstraintGE, f"r{i}_lo", row_lower[i])
+            names.append((i, f"r{i}_lo"))
+
+    fd, log_path = tempfile.mkstemp(suffix=".log", prefix="cbc-")
+    os.close(fd)
+    try:
+        # The log file is where _cbc_result reads the status and bound; some PuLP
+        # versions warn on every solve that it replaces the console output.
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", message="`logPath` argument replaces", category=UserWarning)
+            prob.solve(pulp.PULP_CBC_CMD(msg=False, timeLimit=time_limit, gapRel=gap_rel, gapAbs=gap_abs,
+                                         threads=threads, logPath=log_path))
+        result = _cbc_result(prob, log_path)
+    finally:
+        os.remove(log_path)
+    if result['objective'] is not None:
+        result['x'] = np.array([var.varValue or 0.0 for var in x])
+    if duals and result['x'] is not None:
+        result['row_duals'] = np.zeros(model.num_rows)
+        for i, name in names:
+            result['row_duals'][i] += prob.constraints[name].pi or 0.0
+    return result
+
+def _cbc_result(prob, log_path):
+    """
+    Status, objective and best bound of a finished CBC solve, taken from the final
+    summary of the CBC log. When CBC omits the bound after proving optimality, the
+    bound is the objective.
+    """
+    import pulp
+    objective = pulp.value(prob.objective)
+    result = _result(pulp.LpStatus[prob.status], objective=objective)
+    with open(log_path, errors="replace") as f:
+        log = f.read()
+    # PuLP reports "Optimal" for any solution CBC returns, including on the time limit.
+    status = re.search(r"^Result - (.+)$", log, re.MULTILINE)
+    if status:
+        result['status'] = status.group(1).strip()
+    # Stopped without an incumbent: the variable values are not an integer solution.
+    if re.search(r"^No feasible solution found", log, re.MULTILINE) or prob.status in (
+            pulp.LpStatusInfeasible, pulp.LpStatusUnbounded):
+        result['objective'] = objective = None
+    bound = re.search(r"^Lower bound:\s*(\S+)", log, re.MULTILINE)
+    if bound:
+        result['best_bound'] = float(bound.group(1))
+    elif prob.status == pulp.LpStatusOptimal and objective is not None:
+        result['best_bound'] = objective
+    return result
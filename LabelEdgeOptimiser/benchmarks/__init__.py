@@ -0,0 +1,8 @@
+# Benchmark suite for the LabelEdge solvers. Run from the LabelEdgeOptimiser directory:
+#   python -m benchmarks.run --tiers 50 500 5000 --out benchmark_results.json
+# MILP build time versus solve time:
+#   python -m benchmarks.milp_build --tiers 500 5000 --time-limit 30
+# PO grouping (filter_po_df, process_groups) versus the row-wise implementation:
+#   python -m benchmarks.po_grouping --tiers 1000 10000 50000
+# Batched SA search versus the classic one, at equal steps or under a time budget:
+#   python -m benchmarks.sa_batched --tiers 500 2000 --time-limit 1
@@ -0,0 +1,107 @@
+import random
+import pandas as pd
+
+# Typical master roll widths (inches) and lengths (feet) found in inventory.
+ROLL_WIDTHS = [6.5, 8.0, 9.75, 10.0, 12.25, 13.0, 16.0]
+ROLL_LENGTHS = [5000.0, 7500.0, 10000.0, 15000.0]
+
+def synthetic_inventory(n_rolls, papers=("P1",), seed=0,
+                        idLabel="Roll ID", paperLabel="Code LabelEdge",
+                        widthLabel="Larg.", lengthLabel="Longueur"):
+    """
+    Random inventory in the shape returned by filter_inv_df: one row per active
+    roll with id, paper code, width (inches) and length (feet), sorted by width.
+    """
+    rnd = random.Random(seed)
+    rows = [{
+        idLabel: f"SYN{i:05d}",
+        paperLabel: rnd.choice(papers),
+        widthLabel: rnd.choice(ROLL_WIDTHS),
+        lengthLabel: rnd.choice(ROLL_LENGTHS),
+    } for i in range(n_rolls)]
+    df = pd.DataFrame(rows, columns=[idLabel, paperLabel, widthLabel, lengthLabel])
+    df = df.sort_values(by=widthLabel, ascending=True)
+    return df.reset_index(drop=True)
+
+def synthetic_selected_pos(n_products, paper="P1", seed=0, length=5, max_types=20):
+    """
+    Random order lines in the "Paper/Width/Length/Nb/msi" format parsed by
+    process_selected_pos, totalling `n_products` individual products.
+    `length` is the product length (thousands of feet) shared by every line.
+    """
+    rnd = random.Random(seed)
+    n_types = max(1, min(max_types, n_products // 10 or 1))
+    widths = sorted({round(rnd.uniform(1.0, 5.5), 2) for _ in range(n_types)}, reverse=True)
+    counts = [1] * len(widths)
+    for _ in range(n_products - len(widths)):
+        counts[rnd.randrange(len(widths))] += 1
+    selected_pos = []
+    for width, nb in zip(widths, counts):
+        msi = nb * width * length * 1000 * 12 / 1000
+        selected_pos.append(f"{paper}/{width}/{length}/{nb}/{msi}")
+    return selected_pos
+
+def synthetic_instance(n_products, paper="P1", seed=0, length=5, slack=1.3):
+    """
+    An (inventory DataFrame, selected_pos) pair whose rolls offer about `slack`
+    times the total product width needed, so every tier stays feasible.
+    """
+    selected_pos = synthetic_selected_pos(n_products, paper=paper, seed=seed, length=length)
+    needed = sum(float(p.split('/')[1]) * int(p.split('/')[3]) for p in selected_pos)
+    rnd = random.Random(seed + 1)
+    rows = []
+    capacity = 0.0
+    while capacity < slack * needed:
+        width = rnd.choice(ROLL_WIDTHS)
+        roll_length = rnd.choice(ROLL_LENGTHS)
+        rows.append({"Roll ID": f"SYN{len(rows):05d}", "Code LabelEdge": paper,
+                     "Larg.": width, "Longueur": roll_length})
+        # Each roll is split into blocks of one product length (see createMasterDict).
+        capacity += width * max(1, int(roll_length // (length * 1000)))
+    inv_df = pd.DataFrame(rows).sort_values(by="Larg.", ascending=True).reset_index(drop=True)
+    return inv_df, selected_pos
+
+def synthetic_po_sheet(n_lines, papers=("P1", "P2"), seed=0, lines_per_order=4,
+                       activeLabel="Actif / Inactif", numberLabel="Notre # comm",
+                       startColLabel="Code Mat", companyLabel="Client",
+                       orderLabel="# Comm Client"):
+    """
+    Random "PO item" sheet in the shape read by load_po: `n_lines` order lines
+    spread over about n_lines / lines_per_order orders, a few inactive lines and
+    a few missing quantities or MSI, as found in the real workbook.
+    """
+    rnd = random.Random(seed)
+    n_orders = max(1, n_lines // lines_per_order)
+    rows = []
+    for i in range(n_lines):
+        number = rnd.randrange(n_orders) + 1
+        width = round(rnd.uniform(1.0, 5.5), 2)
+        qty = rnd.randint(1, 40)
+        rows.append({
+            activeLabel: "I" if rnd.random() < 0.05 else "A",
+            numberLabel: number,
+            startColLabel: f"{rnd.choice(papers)}/{width}/5",
+            companyLabel: f"Client {number % 97}",
+            orderLabel: f"C{number:06d}",
+            "Qté totale": float("nan") if rnd.random() < 0.02 else qty,
+            "Total msi": float("nan") if rnd.random() < 0.02 else qty * width * 5 * 12,
+        })
+    return pd.DataFrame(rows)
+
+def synthetic_product_groups(n_rows, n_groups, seed=0, fill=0.3):
+    """
+    Random wide sheet for process_groups: an order number column followed by
+    `n_groups` groups of 4 product columns, of which about `fill` are filled.
+    """
+    rnd = random.Random(seed)
+    columns = {"Notre # comm": list(range(1, n_rows + 1))}
+    for g in range(n_groups):
+        cells = [[None, None, None, None] for _ in range(n_rows)]
+        for row in cells:
+            if rnd.random() < fill:
+                width = round(rnd.uniform(1.0, 5.5), 2)
+                qty = rnd.randint(1, 40)
+                row[:] = [f"L{g}", f"P1/{width}/5", qty, qty * width * 60]
+        for k in range(4):
+            columns[f"G{g + 1}.{k + 1}"] = [row[k] for row in cells]
+    return pd.DataFrame(columns)
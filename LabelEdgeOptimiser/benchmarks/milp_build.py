@@ -0,0 +1,66 @@
+import argparse
+import json
+
+from backends import BACKENDS
+from benchmarks.generators import synthetic_instance
+from milp import optimize_assignment
+from profiling import PhaseTimer
+from simulated_annealing import calculateWaste, is_valid_solution
+from utils import process_selected_pos, filter_inventory, createMasterDict
+
+DEFAULT_TIERS = [50, 500, 5000]
+
+def run_case(n_products, aggregate, seed=0, time_limit=30, backend="auto"):
+    """Build and solve one MILP, returning build, solve and mapping times separately."""
+    inv_df, selected_pos = synthetic_instance(n_products, seed=seed)
+    products, _ = process_selected_pos(selected_pos)
+    keys = ['Paper', 'Width', 'Length', 'Nb', 'msi']
+    products_dict = [dict(zip(keys, item.split('/'))) for item in selected_pos]
+    masters = createMasterDict(inv_df=filter_inventory(inv_df, ["P1"]), prod_list_length=products[0][1])
+    n_blocks = sum(len(m['Products']) for m in masters)
+
+    timer = PhaseTimer()
+    stats = {}
+    masters = optimize_assignment(masters, products_dict, time_limit=time_limit, timer=timer,
+                                  aggregate=aggregate, stats=stats, backend=backend)
+    phases = {span['name']: round(span['duration'], 4) for span in timer.spans}
+    valid = is_valid_solution(masters, n_products)
+    return {
+        "n_products": n_products,
+        "n_blocks": n_blocks,
+        "model": "block_class" if aggregate else "per_block",
+        "backend": stats.get("backend"),
+        "build_s": phases.get("milp.build"),
+        "solve_s": phases.get("milp.solve"),
+        "map_s": phases.get("milp.map_solution"),
+        "status": stats.get("status"),
+        "waste_pct": calculateWaste(masters) if valid else None,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time MILP model construction separately from solving.")
+    parser.add_argument("--tiers", type=int, nargs="+", default=DEFAULT_TIERS,
+                        help="Number of products per instance.")
+    parser.add_argument("--models", nargs="+", default=["block_class", "per_block"],
+                        choices=["block_class", "per_block"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-limit", type=float, default=30,
+                        help="Solver time limit per model in seconds.")
+    parser.add_argument("--backend", default="auto", choices=BACKENDS)
+    parser.add_argument("--out", default=None, help="Optional JSON file for the records.")
+    args = parser.parse_args(argv)
+
+    results = []
+    for n_products in args.tiers:
+        for model in args.models:
+            record = run_case(n_products, model == "block_class", seed=args.seed,
+                              time_limit=args.time_limit, backend=args.backend)
+            print(json.dumps(record))
+            results.append(record)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.out}")
+
+if __name__ == "__main__":
+    main()
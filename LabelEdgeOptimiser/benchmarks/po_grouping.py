@@ -0,0 +1,104 @@
+import argparse
+import contextlib
+import io
+import json
+import time
+
+from benchmarks.generators import synthetic_po_sheet, synthetic_product_groups
+from fileInput import filter_po_df, process_groups
+
+DEFAULT_TIERS = [1000, 10000, 50000]
+
+def rowwise_filter_po_df(df, start_row, actIna="A", activeLabel='Actif / Inactif',
+                         numberLabel='Notre # comm', startColLabel='Code Mat',
+                         companyLabel='Client', orderLabel='# Comm Client'):
+    """filter_po_df as it was before vectorizing: list aggregation and a row-wise join."""
+    print(df)
+    if activeLabel in df.columns:
+        df = df[df[activeLabel] == actIna]
+    df = df[df[numberLabel] >= start_row]
+    grouped = df.groupby(numberLabel, as_index=False).agg({
+        companyLabel: 'first', orderLabel: 'first',
+        startColLabel: list, 'Qté totale': list, 'Total msi': list,
+    })
+    grouped['Codes_Qty'] = grouped.apply(
+        lambda row: ", ".join(f"{c}/{q}/{m}" for c, q, m in
+                              zip(row[startColLabel], row['Qté totale'], row['Total msi'])), axis=1)
+    result = grouped[[numberLabel, companyLabel, orderLabel, 'Codes_Qty']].copy()
+    result = result.rename(columns={numberLabel: 'PO_Number', companyLabel: 'Client',
+                                    orderLabel: 'Order_Number', 'Codes_Qty': 'Products'})
+    print(result)
+    return result
+
+def rowwise_process_groups(df, start_column):
+    """process_groups as it was before vectorizing: one column per group, row-wise count."""
+    print("GRoups: \n", df)
+    start_index = df.columns.get_loc(start_column)
+    processed_df = df.iloc[:, :start_index].copy()
+    remaining_columns = df.iloc[:, start_index:]
+    product_columns = []
+    for group_idx in range(len(remaining_columns.columns) // 4):
+        group_columns = remaining_columns.iloc[:, group_idx * 4:group_idx * 4 + 4]
+        name = f"Product#{group_idx + 1}"
+        processed_df[name] = (group_columns.iloc[:, 1].astype(str) + '/' +
+                              group_columns.iloc[:, 2].astype(str) + '/' +
+                              group_columns.iloc[:, 3].astype(str))
+        product_columns.append(name)
+    processed_df["num_products"] = processed_df[product_columns].apply(
+        lambda row: sum(value not in ("nan/nan/nan", "//0/nan/nan", "//0/nan/0.0", "//nan/nan")
+                        for value in row), axis=1)
+    print(processed_df)
+    return processed_df
+
+def _timed(fn, *args):
+    # Both versions print their frames; keep that out of the benchmark output.
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = fn(*args)
+        return result, time.perf_counter() - start
+
+def run_case(n_lines, seed=0, n_groups=40):
+    """Time the vectorized PO functions against their row-wise versions on one sheet."""
+    po_df = synthetic_po_sheet(n_lines, seed=seed)
+    grouped, filter_s = _timed(filter_po_df, po_df, 1)
+    reference, rowwise_filter_s = _timed(rowwise_filter_po_df, po_df, 1)
+
+    wide_df = synthetic_product_groups(max(1, n_lines // n_groups), n_groups, seed=seed)
+    start_column = wide_df.columns[1]
+    processed, groups_s = _timed(process_groups, wide_df, start_column)
+    reference_groups, rowwise_groups_s = _timed(rowwise_process_groups, wide_df, start_column)
+
+    return {
+        "n_lines": n_lines,
+        "n_orders": len(grouped),
+        "filter_po_df_s": round(filter_s, 4),
+        "filter_po_df_rowwise_s": round(rowwise_filter_s, 4),
+        "filter_po_df_identical": grouped.reset_index(drop=True).equals(reference.reset_index(drop=True)),
+        "process_groups_cells": len(wide_df) * n_groups,
+        "process_groups_s": round(groups_s, 4),
+        "process_groups_rowwise_s": round(rowwise_groups_s, 4),
+        "process_groups_identical": processed.equals(reference_groups),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time PO grouping against the row-wise implementation.")
+    parser.add_argument("--tiers", type=int, nargs="+", default=DEFAULT_TIERS,
+                        help="Number of PO lines per generated sheet.")
+    parser.add_argument("--groups", type=int, default=40,
+                        help="Product groups of 4 columns in the wide process_groups sheet.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="Optional JSON file for the records.")
+    args = parser.parse_args(argv)
+
+    results = []
+    for n_lines in args.tiers:
+        record = run_case(n_lines, seed=args.seed, n_groups=args.groups)
+        print(json.dumps(record))
+        results.append(record)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.out}")
+
+if __name__ == "__main__":
+    main()
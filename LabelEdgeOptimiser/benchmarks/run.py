@@ -0,0 +1,84 @@
+import argparse
+import json
+import platform
+import time
+import tracemalloc
+from datetime import datetime
+
+from backends import BACKENDS
+from benchmarks.generators import synthetic_instance
+from pipeline import solve_instance
+from simulated_annealing import calculateWaste, is_valid_solution
+
+DEFAULT_TIERS = [50, 500, 5000]
+DEFAULT_ALGORITHMS = ["SA", "MILP", "COLGEN", "GILMORE_GOMORY"]
+
+def run_case(algorithm, n_products, seed=0, time_limit=60, num_restarts=5, iterations=2000, len_tol=0.3,
+             backend="auto"):
+    """Solve one synthetic instance and return a result record."""
+    inv_df, selected_pos = synthetic_instance(n_products, seed=seed)
+    # SA runs in-process so tracemalloc sees its allocations.
+    options = {"workers": 1, "time_limit": time_limit, "backend": backend}
+    info = {}
+    tracemalloc.start()
+    start = time.perf_counter()
+    masters = solve_instance(inv_df, selected_pos, ["P1"], algorithm=algorithm, len_tol=len_tol,
+                             num_restarts=num_restarts, iterations=iterations, options=options,
+                             info=info)
+    wall_time = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    valid = masters is not None and is_valid_solution(masters, n_products)
+    return {
+        "algorithm": algorithm,
+        "n_products": n_products,
+        "n_rolls": len(inv_df),
+        "seed": seed,
+        "time_limit": time_limit,
+        "wall_time_s": round(wall_time, 4),
+        "peak_memory_mb": round(peak / 2**20, 3),
+        "waste_pct": calculateWaste(masters) if valid else None,
+        "valid": valid,
+        "waste_bound_pct": info.get("waste_bound"),
+        "waste_gap": info.get("waste_gap") if valid else None,
+        "gap": info.get("gap"),
+        "backend": info.get("backend"),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the LabelEdge solvers on synthetic data.")
+    parser.add_argument("--tiers", type=int, nargs="+", default=DEFAULT_TIERS,
+                        help="Number of products per instance.")
+    parser.add_argument("--algorithms", nargs="+", default=DEFAULT_ALGORITHMS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--time-limit", type=float, default=60,
+                        help="Wall-clock budget per solve in seconds.")
+    parser.add_argument("--restarts", type=int, default=5)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--backend", default="auto", choices=BACKENDS,
+                        help="Solver backend for the MILP and Gilmore-Gomory masters.")
+    parser.add_argument("--out", default="benchmark_results.json")
+    args = parser.parse_args(argv)
+
+    results = []
+    for n_products in args.tiers:
+        for algorithm in args.algorithms:
+            record = run_case(algorithm, n_products, seed=args.seed, time_limit=args.time_limit,
+                              num_restarts=args.restarts, iterations=args.iterations,
+                              backend=args.backend)
+            print(json.dumps(record))
+            results.append(record)
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.out}")
+
+if __name__ == "__main__":
+    main()
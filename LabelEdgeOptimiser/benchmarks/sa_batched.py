@@ -0,0 +1,71 @@
+import argparse
+import json
+import random
+import time
+
+from benchmarks.generators import synthetic_instance
+from simulated_annealing import (calculateWaste, is_valid_solution, localSearch, localSearch_batched,
+                                 sa_master_template, compute_initial_solution)
+from utils import process_selected_pos
+
+DEFAULT_TIERS = [50, 500, 2000]
+
+def run_case(n_products, variant, batch_size=8, selection="boltzmann", seed=0,
+             iterations=5000, time_limit=None):
+    """Run one SA chain, classic or batched, from the best-fit start and time it."""
+    inv_df, selected_pos = synthetic_instance(n_products, seed=seed)
+    products, total_msi = process_selected_pos(selected_pos)
+    template = sa_master_template(inv_df, products)
+    masters = compute_initial_solution(template, products, 0.5)
+    start_waste = calculateWaste(masters)
+
+    random.seed(seed)
+    deadline = time.time() + time_limit if time_limit else None
+    start = time.perf_counter()
+    if variant == "batched":
+        masters, _ = localSearch_batched(masters, total_msi, iterations=iterations, lengthTol=0.5,
+                                         initial_temp=1.0, cooling_rate=0.99, batch_size=batch_size,
+                                         selection=selection, deadline=deadline)
+    else:
+        masters, _ = localSearch(masters, total_msi, iterations=iterations, lengthTol=0.5,
+                                 initial_temp=1.0, cooling_rate=0.99, deadline=deadline)
+    elapsed = time.perf_counter() - start
+    valid = is_valid_solution(masters, n_products)
+    return {
+        "n_products": n_products,
+        "seed": seed,
+        "variant": variant if variant == "classic" else f"batched_{selection}_{batch_size}",
+        "start_waste_pct": start_waste,
+        "waste_pct": calculateWaste(masters) if valid else None,
+        "elapsed_s": round(elapsed, 4),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the batched SA search with the classic one.")
+    parser.add_argument("--tiers", type=int, nargs="+", default=DEFAULT_TIERS,
+                        help="Number of products per instance.")
+    parser.add_argument("--seeds", type=int, default=5, help="Instances per tier.")
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--time-limit", type=float, default=None,
+                        help="Optional wall-clock budget per chain in seconds.")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--selection", default="boltzmann", choices=["best", "boltzmann"])
+    parser.add_argument("--out", default=None, help="Optional JSON file for the records.")
+    args = parser.parse_args(argv)
+
+    results = []
+    for n_products in args.tiers:
+        for seed in range(args.seeds):
+            for variant in ("classic", "batched"):
+                record = run_case(n_products, variant, batch_size=args.batch_size,
+                                  selection=args.selection, seed=seed,
+                                  iterations=args.iterations, time_limit=args.time_limit)
+                print(json.dumps(record))
+                results.append(record)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import bisect
+
+########################################
+# Best-Fit Index (sorted by remaining width)
+########################################
+class SlackIndex:
+    """
+    Blocks kept sorted by remaining width, so the best-fit block for a product
+    is found with a binary search instead of a scan over every block.
+
+    Each block is identified by its insertion order, which also breaks ties:
+    among blocks with the same remaining width, the first one added wins, the
+    same block a linear scan with a strict `<` comparison would pick.
+    """
+
+    def __init__(self):
+        self._keys = []  # sorted (free_width, order)
+        self._free = []  # free_width by order
+
+    def add(self, free_width):
+        """Register a block with `free_width` remaining; returns its order id."""
+        order = len(self._free)
+        self._free.append(free_width)
+        bisect.insort(self._keys, (free_width, order))
+        return order
+
+    def free(self, order):
+        return self._free[order]
+
+    def best_fit(self, width):
+        """Order id of the block with the least remaining width >= `width`, or None."""
+        i = bisect.bisect_left(self._keys, (width, -1))
+        if i == len(self._keys):
+            return None
+        return self._keys[i][1]
+
+    def update(self, order, free_width):
+        old_key = (self._free[order], order)
+        del self._keys[bisect.bisect_left(self._keys, old_key)]
+        self._free[order] = free_width
+        bisect.insort(self._keys, (free_width, order))
+
+########################################
+# First-Fit Index (max segment tree)
+########################################
+class FirstFitTree:
+    """
+    Segment tree over a fixed sequence of values keeping the maximum of each
+    range, used to find the first position whose value is >= a threshold in
+    logarithmic time.
+    """
+
+    def __init__(self, values):
+        self._n = len(values)
+        self._size = 1
+        while self._size < max(self._n, 1):
+            self._size *= 2
+        self._tree = [float('-inf')] * (2 * self._size)
+        self._tree[self._size:self._size + self._n] = values
+        for i in range(self._size - 1, 0, -1):
+            self._tree[i] = max(self._tree[2 * i], self._tree[2 * i + 1])
+
+    def value(self, pos):
+        return self._tree[self._size + pos]
+
+    def update(self, pos, value):
+        i = self._size + pos
+        self._tree[i] = value
+        i //= 2
+        while i:
+            self._tree[i] = max(self._tree[2 * i], self._tree[2 * i + 1])
+            i //= 2
+
+    def find_first(self, threshold):
+        """Smallest position whose value is >= `threshold`, or None."""
+        if self._n == 0 or self._tree[1] < threshold:
+            return None
+        i = 1
+        while i < self._size:
+            i = 2 * i if self._tree[2 * i] >= threshold else 2 * i + 1
+        return i - self._size
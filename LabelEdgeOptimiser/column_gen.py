@@ -1,7 +1,26 @@
-import pulp
+import time
 from collections import defaultdict
+from profiling import NULL_TIMER
+from backends import SparseModel, solve_model
+from knapsack import bounded_knapsack, PatternCache
+from compatibility import CompatibilityIndex
+from utils import block_classes
+from simulated_annealing import initialSolHeuristic, calculateWaste
 
-def optimize_assignment_column_generation(masters, products):
+def _greedy_pattern(capacity, product_widths, demand):
+    """
+    Largest-first fill of one block, used instead of the knapsack once the time
+    budget is spent. `product_widths` must be sorted largest first.
+    """
+    pattern = []
+    remaining = capacity
+    for w in product_widths:
+        count = min(demand[w], int(remaining // w)) if w > 0 else 0
+        pattern.append(max(count, 0))
+        remaining -= w * pattern[-1]
+    return pattern
+
+def optimize_assignment_column_generation(masters, products, deadline=None, timer=None, len_tol=None):
     """
     Assign product orders to master roll blocks using a column generation (knapsack) approach
     with an iterative improvement phase and a fallback mechanism.
@@ -9,6 +28,11 @@ def optimize_assignment_column_generation(masters, products):
     Parameters:
       masters: a list of master roll dictionaries (e.g. created via createMasterDict)
       products: a list of product tuples (width, length_in_mm, product_msi) from process_selected_pos.
+      deadline: optional time.time() value. Once it passes, remaining blocks are filled
+                greedily and the improvement phase stops, returning the current assignment.
+      timer: optional PhaseTimer recording the initial and improvement phases.
+      len_tol: optional length tolerance; a block only takes products whose length is
+               within this fraction of its allocated length (see CompatibilityIndex).
       
     Returns:
       masters: The master roll structure updated with product assignments in each block and waste calculated.
@@ -34,110 +58,276 @@ def optimize_assignment_column_generation(masters, products):
 
     # Create a sorted list of unique product widths (largest first)
     product_widths = sorted(demand.keys(), reverse=True)
+    # Blocks of equal width often see the same residual demand, so their knapsacks repeat.
+    patterns = PatternCache(product_widths)
+    # Widths each block may take: the product fits and, with len_tol, its length is in range.
+    compat = CompatibilityIndex.from_masters(masters, product_widths, [rep[w][1] for w in product_widths],
+                                             len_tol=len_tol, demand=[demand[w] for w in product_widths])
 
-    # === Initial Assignment Phase ===
-    for master in masters:
-        master['Waste'] = []
-        num_blocks = len(master['Products'])
-        for b in range(num_blocks):
-            capacity = master['Width']  # The available width for this block.
-            # If no remaining demand, assign an empty block (full waste)
-            if all(demand[w] <= 0 for w in product_widths):
-                master['Products'][b] = []
-                master['Waste'].append(capacity)
-                continue
-
-            # Set up the knapsack problem for this block.
-            knap = pulp.LpProblem("Knapsack_Block", pulp.LpMaximize)
-            x = {}
-            for i, w in enumerate(product_widths):
-                x[i] = pulp.LpVariable(f"x_{i}", lowBound=0, cat="Integer")
-            # Objective: maximize total width used.
-            knap += pulp.lpSum(product_widths[i] * x[i] for i in range(len(product_widths)))
-            # Constraint: do not exceed the block capacity (with a tiny tolerance).
-            knap += pulp.lpSum(product_widths[i] * x[i] for i in range(len(product_widths))) <= capacity + EPS
-            # Constraint: do not exceed the remaining demand.
-            for i, w in enumerate(product_widths):
-                knap += x[i] <= demand[w]
-            
-            knap.solve(pulp.PULP_CBC_CMD(msg=0))
-            pattern = [int(pulp.value(x[i]) or 0) for i in range(len(product_widths))]
-            
-            # Fallback: if no products can be cut from this block even though there is demand,
-            # force at least one piece of the smallest product that fits.
-            if sum(pattern) == 0:
-                # Find the smallest product that fits into the block and that has demand.
-                forced_assigned = False
-                for w in sorted(product_widths):
-                    if demand[w] > 0 and w <= capacity:
-                        pattern[product_widths.index(w)] = 1
-                        forced_assigned = True
-                        break
-                if not forced_assigned:
+    def block_demand(g):
+        """Remaining demand restricted to the widths block `g` is compatible with."""
+        return {w: demand[w] if compat.mask[g, i] else 0 for i, w in enumerate(product_widths)}
+
+    timer = timer or NULL_TIMER
+    with timer.span("colgen.initial_phase"):
+        # === Initial Assignment Phase ===
+        g = -1  # Block index across all masters, as in the CompatibilityIndex.
+        for master in masters:
+            master['Waste'] = []
+            num_blocks = len(master['Products'])
+            for b in range(num_blocks):
+                g += 1
+                capacity = master['Width']  # The available width for this block.
+                # If no remaining demand, assign an empty block (full waste)
+                if all(demand[w] <= 0 for w in product_widths):
                     master['Products'][b] = []
                     master['Waste'].append(capacity)
                     continue
+
+                allowed = block_demand(g)
+                if deadline is not None and time.time() >= deadline:
+                    # Out of time: every block still needs an assignment, so fill it greedily.
+                    pattern = _greedy_pattern(capacity + EPS, product_widths, allowed)
+                else:
+                    # Bounded knapsack for this block: maximize total width used within the
+                    # block capacity (with a tiny tolerance) and the remaining demand.
+                    pattern, _ = patterns.solve(capacity + EPS, [allowed[w] for w in product_widths])
+                    pattern = list(pattern)
             
-            # Build the block assignment and update global demand.
-            block_assignment = []
-            for i, count in enumerate(pattern):
-                for _ in range(count):
-                    block_assignment.append(rep[product_widths[i]])
-                    demand[product_widths[i]] -= 1
-            master['Products'][b] = block_assignment
-            used = sum(product_widths[i] * pattern[i] for i in range(len(product_widths)))
-            waste = capacity - used
-            master['Waste'].append(waste)
-
-    # === Optional: Iterative Improvement Phase ===
-    # (This part remains similar to the previous version; you can adjust iterations if desired.)
-    max_iter = 5  # Adjust as needed.
-    iteration = 0
-    improved = True
-    while improved and iteration < max_iter:
-        improved = False
-        # For each master roll and block, try to improve the assignment.
-        for master in masters:
-            capacity = master['Width']
-            num_blocks = len(master['Products'])
-            for b in range(num_blocks):
-                current_assignment = master['Products'][b]
-                current_used = sum(item[0] for item in current_assignment)
+                # Fallback: if no products can be cut from this block even though there is demand,
+                # force at least one piece of the smallest product that fits.
+                if sum(pattern) == 0:
+                    # Find the smallest product that fits into the block and that has demand.
+                    forced_assigned = False
+                    for w in sorted(product_widths):
+                        if allowed[w] > 0 and w <= capacity:
+                            pattern[product_widths.index(w)] = 1
+                            forced_assigned = True
+                            break
+                    if not forced_assigned:
+                        master['Products'][b] = []
+                        master['Waste'].append(capacity)
+                        continue
+            
+                # Build the block assignment and update global demand.
+                block_assignment = []
+                for i, count in enumerate(pattern):
+                    for _ in range(count):
+                        block_assignment.append(rep[product_widths[i]])
+                        demand[product_widths[i]] -= 1
+                master['Products'][b] = block_assignment
+                used = sum(product_widths[i] * pattern[i] for i in range(len(product_widths)))
+                waste = capacity - used
+                master['Waste'].append(waste)
+
+    with timer.span("colgen.improvement_phase"):
+        # === Optional: Iterative Improvement Phase ===
+        # (This part remains similar to the previous version; you can adjust iterations if desired.)
+        max_iter = 5  # Adjust as needed.
+        iteration = 0
+        improved = True
+        while improved and iteration < max_iter:
+            improved = False
+            # For each master roll and block, try to improve the assignment.
+            g = -1
+            for master in masters:
+                capacity = master['Width']
+                num_blocks = len(master['Products'])
+                for b in range(num_blocks):
+                    g += 1
+                    if deadline is not None and time.time() >= deadline:
+                        # Time budget spent: keep the current incumbent.
+                        return masters
+                    current_assignment = master['Products'][b]
+                    current_used = sum(item[0] for item in current_assignment)
                 
-                # Restore current assignment back into demand.
-                temp_counts = defaultdict(int)
-                for item in current_assignment:
-                    temp_counts[item[0]] += 1
-                    demand[item[0]] += 1
-
-                # Re-solve the knapsack for this block.
-                knap = pulp.LpProblem("Knapsack_Block_Improve", pulp.LpMaximize)
-                x = {}
-                for i, w in enumerate(product_widths):
-                    x[i] = pulp.LpVariable(f"x_imp_{i}", lowBound=0, cat="Integer")
-                knap += pulp.lpSum(product_widths[i] * x[i] for i in range(len(product_widths)))
-                knap += pulp.lpSum(product_widths[i] * x[i] for i in range(len(product_widths))) <= capacity + EPS
-                for i, w in enumerate(product_widths):
-                    knap += x[i] <= demand[w]
-                knap.solve(pulp.PULP_CBC_CMD(msg=0))
-                new_pattern = [int(pulp.value(x[i]) or 0) for i in range(len(product_widths))]
-                new_used = sum(product_widths[i] * new_pattern[i] for i in range(len(product_widths)))
+                    # Restore current assignment back into demand.
+                    temp_counts = defaultdict(int)
+                    for item in current_assignment:
+                        temp_counts[item[0]] += 1
+                        demand[item[0]] += 1
+
+                    # Re-solve the knapsack for this block.
+                    allowed = block_demand(g)
+                    new_pattern, _ = patterns.solve(capacity + EPS, [allowed[w] for w in product_widths])
+                    new_used = sum(product_widths[i] * new_pattern[i] for i in range(len(product_widths)))
                 
-                # If improvement, update assignment.
-                if new_used > current_used:
-                    new_assignment = []
-                    for i, count in enumerate(new_pattern):
-                        for _ in range(count):
-                            new_assignment.append(rep[product_widths[i]])
-                            demand[product_widths[i]] -= 1
-                    master['Products'][b] = new_assignment
-                    master['Waste'][b] = capacity - new_used
-                    improved = True
-                else:
-                    # Otherwise, revert: remove the temporary counts.
-                    for w, count in temp_counts.items():
-                        demand[w] -= count
-                    master['Products'][b] = current_assignment
-        iteration += 1
+                    # If improvement, update assignment.
+                    if new_used > current_used:
+                        new_assignment = []
+                        for i, count in enumerate(new_pattern):
+                            for _ in range(count):
+                                new_assignment.append(rep[product_widths[i]])
+                                demand[product_widths[i]] -= 1
+                        master['Products'][b] = new_assignment
+                        master['Waste'][b] = capacity - new_used
+                        improved = True
+                    else:
+                        # Otherwise, revert: remove the temporary counts.
+                        for w, count in temp_counts.items():
+                            demand[w] -= count
+                        master['Products'][b] = current_assignment
+            iteration += 1
+
+    print("Knapsack pattern cache:", patterns.stats())
+
+    return masters
 
+########################################
+# Gilmore–Gomory Column Generation
+########################################
+# Cost per unit of unmet demand in the restricted master, so it is always feasible.
+UNMET_PENALTY = 1e6
+REDUCED_COST_TOL = 1e-6
+EPS_PATTERN = 1e-9  # Tolerance on pattern width sums
+# Optimality gap accepted in the final integer master, in waste percentage points of
+# the ordered MSI. Closing the last few MSI of the gap can take CBC minutes.
+INTEGER_GAP_PCT = 0.1
+
+def _pattern_cost(key, pattern, widths):
+    """Unused MSI of a block of class key = (W, L) cut with `pattern`."""
+    W, L = key
+    used = sum(w * a for w, a in zip(widths, pattern))
+    return ((L * 12) / 1000) * (W - used)
+
+def _solve_restricted_master(classes, columns, widths, demand, relax=True, time_limit=None, gap_abs=None,
+                             backend="auto"):
+    """
+    Solve the restricted master over `columns` ((class_key, pattern) pairs):
+        min  sum cost_j z_j + UNMET_PENALTY * sum s_i
+        s.t. sum_j a_ij z_j + s_i == demand_i   for every product type i
+             sum_{j in class c} z_j <= n_c      for every block class c
+    With `relax`, z is continuous and the duals are returned as
+    (demand_duals, class_duals); otherwise both are None.
+    `gap_abs` is the absolute optimality gap accepted by the integer solve.
+    Returns (z values, unmet s values, demand_duals, class_duals).
+    """
+    model = SparseModel("GG_Master")
+    model.add_vars([_pattern_cost(key, pattern, widths) for key, pattern in columns], integer=True)
+    model.add_vars([UNMET_PENALTY] * len(widths), integer=True)
+    rows, cols, vals = [], [], []
+    for j, (_, pattern) in enumerate(columns):
+        for i, count in enumerate(pattern):
+            if count:
+                rows.append(i)
+                cols.append(j)
+                vals.append(count)
+    rows.extend(range(len(widths)))
+    cols.extend(range(len(columns), len(columns) + len(widths)))
+    vals.extend([1.0] * len(widths))
+    demand_rows = model.add_rows(rows, cols, vals, demand, demand)
+    class_index = {key: c for c, key in enumerate(classes)}
+    class_rows = model.add_rows([class_index[key] for key, _ in columns], range(len(columns)),
+                                [1.0] * len(columns), float('-inf'),
+                                [len(blocks) for blocks in classes.values()])
+
+    result = solve_model(model, backend=backend, integer=not relax, time_limit=time_limit,
+                         gap_abs=gap_abs, duals=relax)
+    x = result['x'] if result['x'] is not None else [0.0] * model.num_vars
+    z_values = list(x[:len(columns)])
+    s_values = list(x[len(columns):])
+    if not relax:
+        return z_values, s_values, None, None
+    duals = result['row_duals']
+    demand_duals = [duals[demand_rows + i] for i in range(len(widths))]
+    class_duals = {key: duals[class_rows + c] for c, key in enumerate(classes)}
+    return z_values, s_values, demand_duals, class_duals
+
+def optimize_assignment_gilmore_gomory(masters, products, deadline=None, timer=None, max_rounds=200,
+                                       backend="auto", len_tol=None):
+    """
+    Assign products to master roll blocks with Gilmore–Gomory column generation.
+
+    Parameters:
+      masters: a list of master roll dictionaries (e.g. created via createMasterDict)
+      products: a list of product tuples (width, length_in_mm, product_msi) from process_selected_pos.
+      deadline: optional time.time() value; column generation stops there and the
+                patterns found so far are used for the integer solve.
+      timer: optional PhaseTimer recording the LP, pricing and integer phases.
+      max_rounds: maximum number of pricing rounds.
+      backend: solver backend for the master problems (see backends.resolve_backend).
+      len_tol: optional length tolerance restricting which product types a block class may
+               take (see CompatibilityIndex).
+
+    Approach:
+      - Blocks with the same master width and allocated length form a class.
+      - A restricted master LP chooses how many blocks of each class to cut with each
+        known pattern, minimizing unused MSI with demand met exactly.
+      - For every class, a pricing knapsack driven by the LP duals looks for a pattern
+        with negative reduced cost; such patterns are added and the LP is re-solved.
+      - When no pattern prices out, the master is re-solved with integer counts over
+        the generated patterns, and the patterns are handed out to concrete blocks.
+        Any demand the integer solve leaves unmet is placed by best-fit.
+    """
+    timer = timer or NULL_TIMER
+
+    # Group products into types keyed on (width, length), as milp._aggregate_products
+    # does, keeping the product tuples of each type to hand out afterwards.
+    items = defaultdict(list)
+    for p in products:
+        items[(p[0], p[1])].append(p)
+    types = sorted(items, reverse=True)
+    widths = [w for w, _ in types]
+    bounds = [len(items[t]) for t in types]
+    classes = block_classes(masters)
+    # Per-class copy bounds: 0 for types that do not fit or are outside the length window.
+    compat = CompatibilityIndex([W for W, _ in classes], [L for _, L in classes], widths,
+                                [length for _, length in types], len_tol=len_tol, demand=bounds,
+                                block_count=[len(blocks) for blocks in classes.values()])
+    class_bounds = {key: [int(b) for b in compat.bounds[c]] for c, key in enumerate(classes)}
+
+    # Initial columns: homogeneous patterns, as many copies of one type as fit.
+    columns = []
+    for key in classes:
+        for i, copies in enumerate(class_bounds[key]):
+            if copies > 0:
+                pattern = [0] * len(widths)
+                pattern[i] = copies
+                columns.append((key, tuple(pattern)))
+    known = set(columns)
+
+    with timer.span("gg.column_generation"):
+        for _ in range(max_rounds):
+            if deadline is not None and time.time() >= deadline:
+                break
+            _, _, demand_duals, class_duals = _solve_restricted_master(
+                classes, columns, widths, bounds, backend=backend)
+            added = 0
+            for key in classes:
+                W, L = key
+                k = (L * 12) / 1000
+                # Reduced cost of pattern a: k*W - mu_c - sum_i (k*w_i + pi_i) * a_i
+                values = [k * w + pi for w, pi in zip(widths, demand_duals)]
+                pattern, value = bounded_knapsack(W + EPS_PATTERN, widths, values, class_bounds[key])
+                reduced_cost = k * W - class_duals[key] - value
+                if reduced_cost < -REDUCED_COST_TOL and (key, pattern) not in known:
+                    columns.append((key, pattern))
+                    known.add((key, pattern))
+                    added += 1
+            if added == 0:
+                break
+
+    with timer.span("gg.integer_master"):
+        time_limit = max(deadline - time.time(), 1) if deadline is not None else None
+        gap_abs = INTEGER_GAP_PCT / 100 * sum(p[2] for p in products)
+        z_values, _, _, _ = _solve_restricted_master(classes, columns, widths, bounds, relax=False,
+                                                     time_limit=time_limit, gap_abs=gap_abs, backend=backend)
+
+    with timer.span("gg.map_solution"):
+        for master in masters:
+            master['Products'] = [[] for _ in master['Products']]
+        free_blocks = {key: iter(blocks) for key, blocks in classes.items()}
+        remaining = [list(items[t]) for t in types]
+        for (key, pattern), value in zip(columns, z_values):
+            for _ in range(int(round(value))):
+                m_idx, b_idx = next(free_blocks[key])
+                block = masters[m_idx]['Products'][b_idx]
+                for i, count in enumerate(pattern):
+                    block.extend(remaining[i][:count])
+                    del remaining[i][:count]
+        # Demand the integer master could not cover goes to the best remaining slack.
+        leftover = [p for type_items in remaining for p in type_items]
+        if leftover:
+            initialSolHeuristic(masters, leftover)
+        calculateWaste(masters)
     return masters
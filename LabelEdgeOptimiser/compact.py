@@ -0,0 +1,123 @@
+import numpy as np
+
+class CompactMasters:
+    """
+    Array-backed equivalent of the `masters` list of dicts used by the solvers.
+
+    Instead of one (width, length, msi) tuple per assigned product, a solution is
+    stored as:
+      - codes: master roll codes, one per master (object array)
+      - width, length: master width and allocated block length, one per master
+      - block_master: index of the owning master, one per block
+      - type_width, type_length, type_msi: one entry per distinct product tuple
+      - counts: integer matrix (product types x blocks) of products of each type
+        assigned to each block
+
+    Use from_masters / to_masters to convert from and to the dict format expected
+    by SolutionDialog and print_masters_table.
+    """
+
+    def __init__(self, codes, width, length, block_master, type_width, type_length, type_msi, counts):
+        self.codes = np.asarray(codes, dtype=object)
+        self.width = np.asarray(width, dtype=np.float64)
+        self.length = np.asarray(length, dtype=np.float64)
+        self.block_master = np.asarray(block_master, dtype=np.int32)
+        self.type_width = np.asarray(type_width, dtype=np.float64)
+        self.type_length = np.asarray(type_length, dtype=np.float64)
+        self.type_msi = np.asarray(type_msi, dtype=np.float64)
+        self.counts = np.asarray(counts, dtype=np.int32).reshape(len(self.type_width), len(self.block_master))
+
+    @classmethod
+    def from_masters(cls, masters, products=None):
+        """
+        Build the compact form of `masters`. If `products` (a list of product tuples)
+        is given, every distinct tuple in it gets a type row even when unassigned.
+        """
+        type_index = {}
+        for p in products or []:
+            type_index.setdefault(tuple(p), len(type_index))
+        for m in masters:
+            for block in m['Products']:
+                for p in block:
+                    type_index.setdefault(tuple(p), len(type_index))
+        types = list(type_index)
+
+        block_master = [mi for mi, m in enumerate(masters) for _ in m['Products']]
+        counts = np.zeros((len(types), len(block_master)), dtype=np.int32)
+        b = 0
+        for m in masters:
+            for block in m['Products']:
+                for p in block:
+                    counts[type_index[tuple(p)], b] += 1
+                b += 1
+
+        return cls(
+            codes=[m['Code'] for m in masters],
+            width=[m['Width'] for m in masters],
+            length=[m['Length'] for m in masters],
+            block_master=block_master,
+            type_width=[t[0] for t in types],
+            type_length=[t[1] for t in types],
+            type_msi=[t[2] for t in types],
+            counts=counts,
+        )
+
+    def to_masters(self):
+        """Expand back into the list-of-dicts format, with 'Waste' filled in per block."""
+        types = [(float(w), float(l), float(s))
+                 for w, l, s in zip(self.type_width, self.type_length, self.type_msi)]
+        block_waste = self.block_waste()
+        masters = [{'Code': code, 'Width': float(w), 'Length': float(l), 'Products': [], 'Waste': []}
+                   for code, w, l in zip(self.codes, self.width, self.length)]
+        for b, mi in enumerate(self.block_master):
+            block = []
+            for t in np.flatnonzero(self.counts[:, b]):
+                block.extend([types[t]] * int(self.counts[t, b]))
+            masters[mi]['Products'].append(block)
+            masters[mi]['Waste'].append(float(block_waste[b]))
+        return masters
+
+    def copy(self):
+        return CompactMasters(self.codes, self.width, self.length, self.block_master,
+                              self.type_width, self.type_length, self.type_msi, self.counts.copy())
+
+    @property
+    def num_blocks(self):
+        return len(self.block_master)
+
+    def block_width(self):
+        return self.width[self.block_master]
+
+    def block_length(self):
+        return self.length[self.block_master]
+
+    def block_used_width(self):
+        return self.type_width @ self.counts
+
+    def block_msi_terms(self):
+        """
+        (master_msi, block_msi) per block, as calculateWaste accumulates them:
+        empty blocks contribute nothing to either total.
+        """
+        length = self.block_length()
+        used = self.block_used_width()
+        nonempty = self.counts.sum(axis=0) > 0
+        master_msi = np.where(nonempty, (length * self.block_width() * 12) / 1000, 0.0)
+        block_msi = (used * length * 12) / 1000
+        return master_msi, block_msi
+
+    def block_waste(self):
+        """Per-block waste percentage (0 for empty blocks), vectorized."""
+        master_msi, block_msi = self.block_msi_terms()
+        waste = np.zeros_like(block_msi)
+        positive = block_msi > 0
+        waste[positive] = np.abs(master_msi[positive] - block_msi[positive]) / block_msi[positive] * 100
+        return waste
+
+    def waste(self):
+        """Overall waste percentage, matching calculateWaste on the dict form."""
+        master_msi, block_msi = self.block_msi_terms()
+        total_prod = block_msi.sum()
+        if total_prod == 0:
+            return float('inf')
+        return float(abs(master_msi.sum() - total_prod) / total_prod * 100)
@@ -0,0 +1,89 @@
+import numpy as np
+
+EPS = 1e-9  # Tolerance on width comparisons
+
+class CompatibilityIndex:
+    """
+    Which product types can be cut from which blocks, and how many at most.
+
+    A type is compatible with a block when its width fits the block width and,
+    if `len_tol` is given, its length is within `len_tol` of the block's allocated
+    length (relative to the block length), the window perturb_solution respects.
+    The upper bound of a compatible pair is floor(W / width), capped by the type's
+    demand when `demand` is given; incompatible pairs have bound 0.
+
+    With `fallback` (the default), a type whose compatible blocks cannot hold its
+    whole demand on their own keeps only the width rule, so pruning on length
+    never makes an order unsolvable. Those types are listed in `relaxed_types`.
+
+    Blocks can be single blocks, block classes or anything else with a width and
+    a length; product lengths must use the same unit as block lengths. When a row
+    stands for several identical blocks (a block class), `block_count` gives how
+    many, for the capacity check of the fallback.
+    """
+
+    def __init__(self, block_width, block_length, type_width, type_length, len_tol=None,
+                 demand=None, fallback=True, block_count=None):
+        self.block_width = np.asarray(block_width, dtype=float)
+        self.block_length = np.asarray(block_length, dtype=float)
+        self.type_width = np.asarray(type_width, dtype=float)
+        self.type_length = np.asarray(type_length, dtype=float)
+        W = self.block_width[:, None]
+        w = self.type_width[None, :]
+
+        fits = w <= W + EPS
+        with np.errstate(divide='ignore', invalid='ignore'):
+            copies = np.where(fits & (w > 0), np.floor((W + EPS) / np.where(w > 0, w, 1)), 0)
+        if demand is not None:
+            copies = np.minimum(copies, np.asarray(demand, dtype=float)[None, :])
+
+        self.mask = fits
+        self.relaxed_types = []
+        if len_tol is not None:
+            L = self.block_length[:, None]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                in_window = np.abs(L - self.type_length[None, :]) / L <= len_tol + EPS
+            mask = fits & in_window
+            if fallback:
+                if demand is not None:
+                    count = np.ones(len(self.block_width)) if block_count is None \
+                        else np.asarray(block_count, dtype=float)
+                    capacity = (copies * mask * count[:, None]).sum(axis=0)
+                    short = capacity < np.asarray(demand, dtype=float)
+                else:
+                    short = ~mask.any(axis=0)
+                # Types the length window would starve keep every block they fit in.
+                mask[:, short] = fits[:, short]
+                self.relaxed_types = [int(t) for t in np.flatnonzero(short & fits.any(axis=0))]
+            self.mask = mask
+        self.bounds = np.where(self.mask, copies, 0).astype(int)
+
+    @classmethod
+    def from_masters(cls, masters, type_width, type_length, len_tol=None, demand=None, fallback=True):
+        """Index over the blocks of `masters` in master order, then block order."""
+        widths = []
+        lengths = []
+        for master in masters:
+            for _ in master['Products']:
+                widths.append(float(master['Width']))
+                lengths.append(float(master['Length']))
+        return cls(widths, lengths, type_width, type_length, len_tol=len_tol, demand=demand,
+                   fallback=fallback)
+
+    def compatible(self, block, product_type):
+        return bool(self.mask[block, product_type])
+
+    def upper_bound(self, block, product_type):
+        return int(self.bounds[block, product_type])
+
+    def types_for(self, block):
+        """Product types that can be cut from `block`."""
+        return np.flatnonzero(self.mask[block])
+
+    def blocks_for(self, product_type):
+        """Blocks `product_type` can be cut from."""
+        return np.flatnonzero(self.mask[:, product_type])
+
+    def pairs(self):
+        """(block indices, type indices) of every compatible pair, block-major."""
+        return np.nonzero(self.mask)
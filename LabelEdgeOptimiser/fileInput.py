@@ -1,6 +1,18 @@
+import hashlib
+import json
+import os
+import numpy as np
 import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.cell.cell import ERROR_CODES
 
-def xlsm_to_dataframe(xlsm_file, sheet_name, start_row=3):
+# Bump when the parsing or filtering changes, so older cache files are not reused.
+CACHE_VERSION = 4
+
+# Product strings process_groups builds from empty product columns.
+INVALID_PRODUCTS = ["nan/nan/nan", "//0/nan/nan", "//0/nan/0.0", "//nan/nan"]
+
+def xlsm_to_dataframe(xlsm_file, sheet_name, start_row=3, columns=None):
     """
     Reads a specific sheet from an .xlsm file, starting from a specified row, and converts it to a Pandas DataFrame.
     
@@ -8,11 +20,23 @@ def xlsm_to_dataframe(xlsm_file, sheet_name, start_row=3):
         xlsm_file (str): Path to the .xlsm file.
         sheet_name (str): Name of the sheet to read.
         start_row (int): Row number to start reading from (1-based index).
+        columns (list): Optional header labels to keep. The sheet is then streamed
+            in read-only mode and only these columns are read (see read_columns).
     
     Returns:
         pd.DataFrame: DataFrame containing the sheet's data starting from the specified row.
     """
     print(f"Reading File: {xlsm_file}")
+    if columns is not None:
+        try:
+            return read_columns(xlsm_file, sheet_name, columns, start_row=start_row)
+        except KeyError as e:
+            # openpyxl raises KeyError for a missing sheet.
+            print(f"Error: {e}")
+            return None
+        except FileNotFoundError:
+            print(f"Error: The file '{xlsm_file}' was not found.")
+            return None
     try:
         # Load the sheet into a Pandas DataFrame, skipping rows before `start_row`
         df = pd.read_excel(
@@ -28,6 +52,40 @@ def xlsm_to_dataframe(xlsm_file, sheet_name, start_row=3):
     except FileNotFoundError:
         print(f"Error: The file '{xlsm_file}' was not found.")
         return None
+
+def read_columns(xlsm_file, sheet_name, columns, start_row=1):
+    """
+    Streams the labelled `columns` of a sheet into a DataFrame. The workbook is
+    opened read-only, the header labels on `start_row` are resolved to column
+    indices, and only those cells are pulled from each following row. Labels not
+    found in the header are left out, as are rows empty in every kept column.
+    Empty cells and Excel errors such as #NAME? become NaN, as with pd.read_excel.
+    """
+    errors = frozenset(ERROR_CODES)
+    wb = load_workbook(xlsm_file, read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb[sheet_name]
+        # Some writers store a wrong sheet size; read up to the last actual row.
+        ws.reset_dimensions()
+        rows = ws.iter_rows(min_row=start_row, values_only=True)
+        header = next(rows, ())
+        index = {}
+        for i, label in enumerate(header):
+            if label is not None:
+                index.setdefault(str(label), i)
+        labels = [label for label in dict.fromkeys(columns) if label in index]
+        indices = [index[label] for label in labels]
+        data = [[] for _ in labels]
+        for row in rows:
+            values = [row[i] if i < len(row) else None for i in indices]
+            if all(v is None for v in values):
+                continue
+            for column, value in zip(data, values):
+                column.append(None if value in errors else value)
+    finally:
+        wb.close()
+    df = pd.DataFrame(dict(zip(labels, data)), columns=labels)
+    return df.fillna(np.nan)
     
 def filter_inv_df(df,
                   actIna="A", 
@@ -76,21 +134,17 @@ def filter_po_df(df,
         .agg({
             companyLabel: 'first',        # or 'unique' if you expect multiple different clients
             orderLabel: 'first',          # same logic as above
-            startColLabel: list,          # collect all Codes
-            'Qté totale': list,           # collect all Qté totales
-            'Total msi': list           # collect all totalMSis
         })
     )
 
-    def combine_code_qty(row):
-        codes = row[startColLabel]
-        qtys = row['Qté totale']
-        total_msi = row['Total msi']
-        # Combine the codes and quantities as before
-        combined = ", ".join(f"{c}/{q}/{m}" for c, q, m in zip(codes, qtys, total_msi))
-        return combined
-
-    grouped['Codes_Qty'] = grouped.apply(combine_code_qty, axis=1)
+    # 4. "Code/Qty/msi" for every line as one string operation, then joined per
+    #    order in line order (groupby keeps the same sorted keys as above).
+    lines = (
+        df[startColLabel].astype(str) + '/' +
+        df['Qté totale'].astype(str) + '/' +
+        df['Total msi'].astype(str)
+    )
+    grouped['Codes_Qty'] = lines.groupby(df[numberLabel]).agg(", ".join).to_numpy()
 
     # You can decide which columns to keep.  Below we keep:
     #   Notre # comm, Client, # Comm Client, and our new combined Code/Qty column
@@ -168,33 +222,139 @@ def process_groups(df, start_column):
     # Group columns starting from the start index
     remaining_columns = df.iloc[:, start_index:]
     num_groups = len(remaining_columns.columns) // 4  # Number of groups of 4
-    product_columns = []
-
-    # Process each group
-    for group_idx in range(num_groups):
-        group_start = group_idx * 4
-        group_columns = remaining_columns.iloc[:, group_start:group_start + 4]
-        
-        # Combine columns 2, 3, and 4 of the group into a single column
-        product_column = (
-            group_columns.iloc[:, 1].astype(str) + '/' +
-            group_columns.iloc[:, 2].astype(str) + '/' +
-            group_columns.iloc[:, 3].astype(str)
-        )
-        
-        # Name the new column as 'Product#X', where X is the group number
-        product_column_name = f"Product#{group_idx + 1}"
-        processed_df[product_column_name] = product_column
-        product_columns.append(product_column_name)
+    product_columns = [f"Product#{group_idx + 1}" for group_idx in range(num_groups)]
+
+    # Columns 2, 3 and 4 of every group combined at once: (rows, groups, 3) strings.
+    positions = [group_idx * 4 + k for group_idx in range(num_groups) for k in (1, 2, 3)]
+    values = (remaining_columns.iloc[:, positions].astype(str).to_numpy(dtype=object)
+              .reshape(len(df), num_groups, 3))
+    products = values[:, :, 0] + '/' + values[:, :, 1] + '/' + values[:, :, 2]
+    product_df = pd.DataFrame(products, index=df.index, columns=product_columns)
+    processed_df = pd.concat([processed_df, product_df], axis=1)
 
     # Add the 'num_products' column by counting valid 'Product#' entries (excluding 'nan/nan/nan')
-    processed_df["num_products"] = processed_df[product_columns].apply(
-        lambda row: sum((value != "nan/nan/nan" 
-                         and value != '//0/nan/nan' 
-                         and value != '//0/nan/0.0'
-                         and value != '//nan/nan') for value in row), axis=1
-    )
+    processed_df["num_products"] = (~product_df.isin(INVALID_PRODUCTS)).sum(axis=1).astype(int)
     
     print(processed_df)
 
     return processed_df
+
+
+########################################
+# Parsed Workbook Cache
+########################################
+def _file_digest(path, chunk_size=1 << 20):
+    """SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _read_feather(path):
+    # Uncompressed Feather files are memory-mapped rather than read and decoded.
+    from pyarrow import feather
+    return feather.read_table(path, memory_map=True).to_pandas()
+
+def _write_cache(df, cache_dir, prefix, name):
+    """
+    Store `df` as uncompressed Feather, or as a pickle when pyarrow cannot hold a
+    column (object columns mixing types); drop older entries of the same sheet.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    for old in os.listdir(cache_dir):
+        if old.startswith(prefix + "-"):
+            os.remove(os.path.join(cache_dir, old))
+    path = os.path.join(cache_dir, name)
+    try:
+        df.to_feather(path + ".feather", compression="uncompressed")
+        return
+    except Exception as e:
+        if os.path.exists(path + ".feather"):
+            os.remove(path + ".feather")
+        print(f"Feather cache unavailable ({e}); using a pickle.")
+    df.to_pickle(path + ".pkl")
+
+def cached_dataframe(xlsm_file, sheet_name, settings, build, cache_dir="cache"):
+    """
+    Returns the DataFrame `build()` parses and filters from `sheet_name` of
+    `xlsm_file`, cached in `cache_dir`.
+
+    Entries are keyed on the file's absolute path, size, mtime and SHA-256, on
+    the sheet, and on `settings` (the column labels and filters `build` uses), so
+    any change to the workbook or the config means a fresh parse. Only the latest
+    entry per workbook and sheet is kept. Missing files are not cached, and
+    `build` then reports the error.
+    """
+    try:
+        stat = os.stat(xlsm_file)
+    except OSError:
+        return build()
+    source = os.path.abspath(xlsm_file)
+    key = json.dumps({"version": CACHE_VERSION, "path": source, "size": stat.st_size,
+                      "mtime": stat.st_mtime_ns, "sha256": _file_digest(xlsm_file),
+                      "sheet": sheet_name, "settings": settings}, sort_keys=True, default=str)
+    prefix = hashlib.sha256(f"{source}|{sheet_name}".encode()).hexdigest()[:16]
+    name = f"{prefix}-{hashlib.sha256(key.encode()).hexdigest()[:16]}"
+
+    for ext, reader in ((".feather", _read_feather), (".pkl", pd.read_pickle)):
+        path = os.path.join(cache_dir, name + ext)
+        if os.path.exists(path):
+            try:
+                df = reader(path)
+                print(f"Read '{sheet_name}' of {xlsm_file} from cache")
+                return df
+            except Exception as e:
+                print(f"Ignoring unreadable cache file {path}: {e}")
+
+    df = build()
+    if df is not None:
+        try:
+            _write_cache(df, cache_dir, prefix, name)
+        except OSError as e:
+            print(f"Could not write cache: {e}")
+    return df
+
+def load_inventory(xlsm_file, sheet_name="Papier", start_row=3, cache_dir=None, **labels):
+    """
+    Inventory sheet read with xlsm_to_dataframe and filtered with filter_inv_df
+    (`labels` are its keyword arguments). With a `cache_dir`, see cached_dataframe.
+    """
+    def build():
+        # filter_inv_df keeps these columns; convert_units also reads the unit columns.
+        columns = [labels.get("activeLabel", "Actif / Inactif"), labels.get("idLabel", "Roll ID"),
+                   labels.get("paperLabel", "Code LabelEdge"), labels.get("widthLabel", "Larg."),
+                   labels.get("lengthLabel", "Longueur"), labels.get("orderBy", "Larg."), "Unit", "Unit2"]
+        df = xlsm_to_dataframe(xlsm_file, sheet_name, start_row=start_row, columns=columns)
+        if df is None:
+            raise ValueError(f"Could not read sheet '{sheet_name}' of {xlsm_file}")
+        return filter_inv_df(df, **labels)
+    if cache_dir is None:
+        return build()
+    settings = dict(labels, start_row=start_row)
+    return cached_dataframe(xlsm_file, sheet_name, settings, build, cache_dir=cache_dir)
+
+def load_po(xlsm_file, start_row, sheet_name="PO item", header_row=1, cache_dir=None, **labels):
+    """
+    PO sheet read with xlsm_to_dataframe and grouped with filter_po_df, keeping
+    orders numbered from `start_row` on (`labels` are filter_po_df's keyword
+    arguments). With a `cache_dir`, see cached_dataframe.
+
+    Client and Order_Number are returned as text, the way the order dialog shows
+    them. Order numbers mix numbers and text, which Feather cannot store.
+    """
+    def build():
+        # The columns filter_po_df reads.
+        columns = [labels.get("activeLabel", "Actif / Inactif"), labels.get("numberLabel", "Notre # comm"),
+                   labels.get("companyLabel", "Client"), labels.get("orderLabel", "# Comm Client"),
+                   labels.get("startColLabel", "Code Mat"), "Qté totale", "Total msi"]
+        df = xlsm_to_dataframe(xlsm_file, sheet_name, start_row=header_row, columns=columns)
+        if df is None:
+            raise ValueError(f"Could not read sheet '{sheet_name}' of {xlsm_file}")
+        po_df = filter_po_df(df, start_row, **labels)
+        po_df[['Client', 'Order_Number']] = po_df[['Client', 'Order_Number']].astype(str)
+        return po_df
+    if cache_dir is None:
+        return build()
+    settings = dict(labels, start_row=start_row, header_row=header_row)
+    return cached_dataframe(xlsm_file, sheet_name, settings, build, cache_dir=cache_dir)
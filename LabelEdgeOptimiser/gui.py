@@ -2,15 +2,18 @@
 from PyQt5 import QtWidgets, QtCore, QtGui
 from solution_dialog import SolutionDialog
 from solve_worker import SolveWorker
-from utils import createProductBlocks
+from utils import build_po_index, createProductBlocks
 import configparser, os
 from config_utils import get_config_path
-from fileInput import xlsm_to_dataframe, filter_inv_df, filter_po_df
+from fileInput import load_inventory, load_po
+from profiling import PhaseTimer
+from backends import BACKENDS
 
 class MainWindow(QtWidgets.QMainWindow):
     def __init__(self, po_df, inv_df):
         super().__init__()
         self.po_df = po_df
+        self.po_index = build_po_index(po_df)
         self.inv_df = inv_df
         self.products = []  
         self.product_checkboxes = []
@@ -32,6 +35,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.stacked_widget.setCurrentIndex(0)
         
         self.solve_worker = None
+        self.solve_info = {}
         self.solve_thread = None
 
     def init_file_settings_page(self):
@@ -146,9 +150,60 @@ class MainWindow(QtWidgets.QMainWindow):
         
         # NEW: Optimization Algorithm selection (SA or MILP)
         self.algorithm = QtWidgets.QComboBox()
-        self.algorithm.addItems(["COLGEN", "MILP", "SA"])
+        self.algorithm.addItems(["COLGEN", "GILMORE_GOMORY", "MILP", "SA", "PORTFOLIO"])
         layout.addRow("Optimization Algorithm:", self.algorithm)
         
+        # Number of processes used for SA restarts (0 = one per CPU core)
+        self.workers_edit = QtWidgets.QLineEdit("0")
+        layout.addRow("SA Worker Processes (0 = all cores):", self.workers_edit)
+        
+        # Candidate moves scored per SA step (0 = classic one-move-per-step SA)
+        self.sa_batch_size_edit = QtWidgets.QLineEdit("0")
+        layout.addRow("SA Batch Size (0 = single move):", self.sa_batch_size_edit)
+        # How a batch picks its move: sampled by Boltzmann weight, or the best candidate
+        self.sa_batch_selection_combo = QtWidgets.QComboBox()
+        self.sa_batch_selection_combo.addItems(["boltzmann", "best"])
+        layout.addRow("SA Batch Selection:", self.sa_batch_selection_combo)
+        
+        # Wall-clock budget honoured by every algorithm, and SA stagnation limits
+        self.time_limit_edit = QtWidgets.QLineEdit("0")
+        layout.addRow("Time Limit in Seconds (0 = none):", self.time_limit_edit)
+        self.stall_iterations_edit = QtWidgets.QLineEdit("0")
+        layout.addRow("SA Stall Iterations (0 = never stop):", self.stall_iterations_edit)
+        self.stall_restarts_edit = QtWidgets.QLineEdit("0")
+        layout.addRow("SA Stall Restarts (0 = never stop):", self.stall_restarts_edit)
+        self.sa_gap_target_edit = QtWidgets.QLineEdit("0")
+        layout.addRow("SA Gap Target in Waste Points (0 = off):", self.sa_gap_target_edit)
+        
+        # CBC settings for the MILP: stopping gap, threads and best-fit warm start
+        self.milp_gap_rel_edit = QtWidgets.QLineEdit("0")
+        layout.addRow("MILP Relative Gap (0 = prove optimality):", self.milp_gap_rel_edit)
+        self.milp_threads_edit = QtWidgets.QLineEdit("0")
+        layout.addRow("MILP Threads (0 = solver default):", self.milp_threads_edit)
+        self.milp_warm_start_checkbox = QtWidgets.QCheckBox("Start the MILP from the best-fit heuristic")
+        self.milp_warm_start_checkbox.setChecked(True)
+        layout.addRow("MILP Warm Start:", self.milp_warm_start_checkbox)
+        
+        # Solve each selected paper separately, on its own rolls, in parallel workers
+        self.decompose_checkbox = QtWidgets.QCheckBox("Solve each paper on its own rolls")
+        self.decompose_checkbox.setChecked(True)
+        layout.addRow("Decompose by Paper:", self.decompose_checkbox)
+        
+        # Engines raced against each other by the PORTFOLIO algorithm
+        self.portfolio_engines_edit = QtWidgets.QLineEdit("SA,MILP,COLGEN,GILMORE_GOMORY")
+        layout.addRow("Portfolio Engines:", self.portfolio_engines_edit)
+        
+        # Solver for the MILP and Gilmore-Gomory master problems (auto = best installed)
+        self.backend_combo = QtWidgets.QComboBox()
+        self.backend_combo.addItems(list(BACKENDS))
+        layout.addRow("Solver Backend:", self.backend_combo)
+        
+        # Optional per-phase timing trace (JSON) and cProfile/tracemalloc dumps
+        self.trace_file_edit = QtWidgets.QLineEdit("")
+        layout.addRow("Timing Trace File (optional):", self.trace_file_edit)
+        self.profile_checkbox = QtWidgets.QCheckBox("Write a profile for each solve")
+        layout.addRow("Profiling:", self.profile_checkbox)
+        
         # Load Files Button
         load_btn = QtWidgets.QPushButton("Load Files")
         load_btn.clicked.connect(self.load_files)
@@ -201,7 +256,25 @@ class MainWindow(QtWidgets.QMainWindow):
             "company_label": "Vendu à",
             "order_label": "No Commande"
         }
-        self.config["Optimization"] = {"algorithm": "MILP"}
+        self.config["Optimization"] = {
+            "algorithm": "MILP",
+            "workers": "0",
+            "sa_batch_size": "0",
+            "sa_batch_selection": "boltzmann",
+            "time_limit": "0",
+            "stall_iterations": "0",
+            "stall_restarts": "0",
+            "sa_gap_target": "0",
+            "milp_gap_rel": "0",
+            "milp_threads": "0",
+            "milp_warm_start": "true",
+            "backend": "auto",
+            "decompose_by_paper": "true",
+            "portfolio_engines": "SA,MILP,COLGEN,GILMORE_GOMORY",
+            "trace_file": "",
+            "profile": "false",
+            "profile_dir": "profiles"
+        }
         
         # If config file exists, read it to override defaults
         if os.path.exists(config_file):
@@ -226,6 +299,23 @@ class MainWindow(QtWidgets.QMainWindow):
         
         # Set the algorithm selection from the Optimization section
         self.algorithm.setCurrentText(self.config.get("Optimization", "algorithm", fallback="SA"))
+        self.workers_edit.setText(self.config.get("Optimization", "workers", fallback="0"))
+        self.sa_batch_size_edit.setText(self.config.get("Optimization", "sa_batch_size", fallback="0"))
+        self.sa_batch_selection_combo.setCurrentText(self.config.get("Optimization", "sa_batch_selection",
+                                                                     fallback="boltzmann"))
+        self.time_limit_edit.setText(self.config.get("Optimization", "time_limit", fallback="0"))
+        self.stall_iterations_edit.setText(self.config.get("Optimization", "stall_iterations", fallback="0"))
+        self.stall_restarts_edit.setText(self.config.get("Optimization", "stall_restarts", fallback="0"))
+        self.sa_gap_target_edit.setText(self.config.get("Optimization", "sa_gap_target", fallback="0"))
+        self.milp_gap_rel_edit.setText(self.config.get("Optimization", "milp_gap_rel", fallback="0"))
+        self.milp_threads_edit.setText(self.config.get("Optimization", "milp_threads", fallback="0"))
+        self.milp_warm_start_checkbox.setChecked(self.config.getboolean("Optimization", "milp_warm_start", fallback=True))
+        self.backend_combo.setCurrentText(self.config.get("Optimization", "backend", fallback="auto"))
+        self.decompose_checkbox.setChecked(self.config.getboolean("Optimization", "decompose_by_paper", fallback=True))
+        self.portfolio_engines_edit.setText(self.config.get("Optimization", "portfolio_engines",
+                                                            fallback="SA,MILP,COLGEN,GILMORE_GOMORY"))
+        self.trace_file_edit.setText(self.config.get("Optimization", "trace_file", fallback=""))
+        self.profile_checkbox.setChecked(self.config.getboolean("Optimization", "profile", fallback=False))
     
     def save_config(self):
         self.config["Paths"] = {"inventory": self.inv_path_edit.text(), "po": self.po_path_edit.text()}
@@ -244,38 +334,65 @@ class MainWindow(QtWidgets.QMainWindow):
             "company_label": self.po_company_label_edit.text(),
             "order_label": self.po_order_label_edit.text()
         }
-        self.config['Optimization'] = {"algorithm": self.algorithm.currentText()}
+        self.config['Optimization'] = {
+            "algorithm": self.algorithm.currentText(),
+            "workers": self.workers_edit.text(),
+            "sa_batch_size": self.sa_batch_size_edit.text(),
+            "sa_batch_selection": self.sa_batch_selection_combo.currentText(),
+            "time_limit": self.time_limit_edit.text(),
+            "stall_iterations": self.stall_iterations_edit.text(),
+            "stall_restarts": self.stall_restarts_edit.text(),
+            "sa_gap_target": self.sa_gap_target_edit.text(),
+            "milp_gap_rel": self.milp_gap_rel_edit.text(),
+            "milp_threads": self.milp_threads_edit.text(),
+            "milp_warm_start": "true" if self.milp_warm_start_checkbox.isChecked() else "false",
+            "backend": self.backend_combo.currentText(),
+            "decompose_by_paper": "true" if self.decompose_checkbox.isChecked() else "false",
+            "portfolio_engines": self.portfolio_engines_edit.text(),
+            "trace_file": self.trace_file_edit.text(),
+            "profile": "true" if self.profile_checkbox.isChecked() else "false",
+            "profile_dir": self.config.get("Optimization", "profile_dir", fallback="profiles")
+        }
         
         with open("config.ini", "w") as f:
             self.config.write(f)
     
     def load_files(self):
         self.save_config()
+        timer = PhaseTimer()
+        # Parsed and filtered sheets are cached next to the config, keyed on the
+        # workbook content and the label settings.
+        cache_dir = os.path.join(os.path.dirname(get_config_path()), "cache")
         try:
-            self.inv_df = xlsm_to_dataframe(
-                xlsm_file=self.inv_path_edit.text(), sheet_name="Papier", start_row=3
-            )
-            self.inv_df = filter_inv_df(
-                self.inv_df,
-                activeLabel=self.inv_active_label_edit.text(),
-                idLabel=self.inv_id_label_edit.text(),
-                paperLabel=self.inv_paper_label_edit.text(),
-                widthLabel=self.inv_width_label_edit.text(),
-                lengthLabel=self.inv_length_label_edit.text()
-            )
-            self.po_df = xlsm_to_dataframe(
-                xlsm_file=self.po_path_edit.text(), sheet_name="PO item", start_row=1
-            )
+            with timer.span("load_inventory"):
+                self.inv_df = load_inventory(
+                    self.inv_path_edit.text(),
+                    sheet_name="Papier",
+                    start_row=3,
+                    cache_dir=cache_dir,
+                    activeLabel=self.inv_active_label_edit.text(),
+                    idLabel=self.inv_id_label_edit.text(),
+                    paperLabel=self.inv_paper_label_edit.text(),
+                    widthLabel=self.inv_width_label_edit.text(),
+                    lengthLabel=self.inv_length_label_edit.text()
+                )
             po_threshold = int(self.po_filter_edit.text())
-            self.po_df = filter_po_df(
-                self.po_df,
-                po_threshold,
-                activeLabel=self.po_active_label_edit.text(),
-                numberLabel=self.po_number_label_edit.text(),
-                startColLabel=self.po_start_col_label_edit.text(),
-                companyLabel=self.po_company_label_edit.text(),
-                orderLabel=self.po_order_label_edit.text()
-            )
+            with timer.span("load_po"):
+                self.po_df = load_po(
+                    self.po_path_edit.text(),
+                    po_threshold,
+                    sheet_name="PO item",
+                    header_row=1,
+                    cache_dir=cache_dir,
+                    activeLabel=self.po_active_label_edit.text(),
+                    numberLabel=self.po_number_label_edit.text(),
+                    startColLabel=self.po_start_col_label_edit.text(),
+                    companyLabel=self.po_company_label_edit.text(),
+                    orderLabel=self.po_order_label_edit.text()
+                )
+            with timer.span("index_po"):
+                self.po_index = build_po_index(self.po_df)
+            print("Load timings:\n" + timer.summary())
         except Exception as e:
             QtWidgets.QMessageBox.critical(self, "Error", str(e))
             return
@@ -294,7 +411,7 @@ class MainWindow(QtWidgets.QMainWindow):
             self.po_df['Client'].astype(str) + " " +
             self.po_df['Order_Number'].astype(str)
         ).tolist()
-        dlg = OrderSelectionDialog(po_list, self.po_df, self)
+        dlg = OrderSelectionDialog(po_list, self.po_index, self)
         if dlg.exec_() == QtWidgets.QDialog.Accepted:
             self.products = dlg.get_products()
             self.update_base_layout()
@@ -379,7 +496,7 @@ class MainWindow(QtWidgets.QMainWindow):
         alg_layout = QtWidgets.QHBoxLayout()
         alg_label = QtWidgets.QLabel("Optimization Algorithm:")
         self.algorithm = QtWidgets.QComboBox()
-        self.algorithm.addItems(["MILP", "SA"])
+        self.algorithm.addItems(["GILMORE_GOMORY", "MILP", "SA", "PORTFOLIO"])
         alg_layout.addWidget(alg_label)
         alg_layout.addWidget(self.algorithm)
         self.base_layout.addLayout(alg_layout)
@@ -437,8 +554,28 @@ class MainWindow(QtWidgets.QMainWindow):
             len_tol = float(self.len_input.text())
             restarts = int(self.restarts_input.text())
             iterations = int(self.iterations_input.text())
+            options = {
+                "workers": int(self.workers_edit.text()),
+                "sa_batch_size": int(self.sa_batch_size_edit.text()),
+                "sa_batch_selection": self.sa_batch_selection_combo.currentText(),
+                "time_limit": float(self.time_limit_edit.text()),
+                "stall_iterations": int(self.stall_iterations_edit.text()),
+                "stall_restarts": int(self.stall_restarts_edit.text()),
+                "sa_gap_target": float(self.sa_gap_target_edit.text()),
+                "milp_gap_rel": float(self.milp_gap_rel_edit.text()),
+                "milp_threads": int(self.milp_threads_edit.text()),
+                "milp_warm_start": self.milp_warm_start_checkbox.isChecked(),
+                "backend": self.backend_combo.currentText(),
+                "decompose_by_paper": self.decompose_checkbox.isChecked(),
+                "portfolio_engines": self.portfolio_engines_edit.text(),
+                "trace_file": self.trace_file_edit.text(),
+                "profile": self.profile_checkbox.isChecked(),
+                # A relative profile directory lives next to the config, like the sheet cache.
+                "profile_dir": os.path.join(os.path.dirname(get_config_path()),
+                                            self.config.get("Optimization", "profile_dir", fallback="profiles"))
+            }
         except ValueError:
-            QtWidgets.QMessageBox.warning(self, "Error", "Invalid input for tolerances or iterations.")
+            QtWidgets.QMessageBox.warning(self, "Error", "Invalid input for tolerances, iterations or workers.")
             return
         
         selected_products = [cb.text() for cb in self.product_checkboxes if cb.isChecked()]
@@ -448,6 +585,7 @@ class MainWindow(QtWidgets.QMainWindow):
             return
         
         self.submit_button.setEnabled(False)
+        self.solve_info = {}
         
         # Pass the algorithm value from the configuration to the SolveWorker.
         self.solve_worker = SolveWorker(
@@ -460,11 +598,14 @@ class MainWindow(QtWidgets.QMainWindow):
             len_tol=len_tol,
             num_restarts=restarts,
             iterations=iterations,
-            algorithm=self.algorithm.currentText()  # <-- Pass the algorithm setting here
+            algorithm=self.algorithm.currentText(),  # <-- Pass the algorithm setting here
+            options=options
         )
         self.solve_worker.progressChanged.connect(self.progress_bar.setValue)
         self.solve_worker.finished.connect(self.handle_solve_finished)
         self.solve_worker.errorOccurred.connect(self.handle_solve_error)
+        self.solve_worker.timingsReported.connect(self.handle_solve_timings)
+        self.solve_worker.solveInfoReported.connect(self.handle_solve_info)
         
         self.solve_thread = QtCore.QThread()
         self.solve_worker.moveToThread(self.solve_thread)
@@ -483,17 +624,38 @@ class MainWindow(QtWidgets.QMainWindow):
         if result is None:
             QtWidgets.QMessageBox.information(self, "Result", "Solve was cancelled or no valid solution found.")
         else:
-            dlg = SolutionDialog(result, self)
+            dlg = SolutionDialog(result, self, info=self.solve_info)
             dlg.exec_()
     
+    def handle_solve_timings(self, timings):
+        total = sum(span['duration'] for span in timings['spans'] if span['parent'] is None)
+        slowest = max((span for span in timings['spans'] if span['parent'] is not None),
+                      key=lambda span: span['duration'], default=None)
+        message = f"Solve took {total:.2f}s"
+        if slowest is not None:
+            message += f" (slowest phase: {slowest['name']} {slowest['duration']:.2f}s)"
+        self.statusBar().showMessage(message)
+    
+    def handle_solve_info(self, info):
+        self.solve_info = info
+        # Appended to the timing message, which is reported just before.
+        message = self.statusBar().currentMessage()
+        if info.get('engine') is not None:
+            message += f" | plan by {info['engine']} in {info['engine_seconds']:.2f}s"
+        if info.get('waste_gap') is not None:
+            message += f" | waste {info['waste']:.2f}%, {info['waste_gap']:.2f} points above the lower bound"
+        if info.get('gap') is not None:
+            message += f" | MILP gap {100 * info['gap']:.2f}%, best bound {info['best_bound']:.2f}"
+        self.statusBar().showMessage(message)
+    
     def handle_solve_error(self, error_msg):
         QtWidgets.QMessageBox.critical(self, "Error", error_msg)
 
 class OrderSelectionDialog(QtWidgets.QDialog):
-    def __init__(self, po_list, po_df, parent=None):
+    def __init__(self, po_list, po_index, parent=None):
         super().__init__(parent)
         self.po_list = po_list
-        self.po_df = po_df
+        self.po_index = po_index
         self.products = []
         self.selected_orders = []
         self.setWindowTitle("Order Selector")
@@ -528,7 +690,7 @@ class OrderSelectionDialog(QtWidgets.QDialog):
     
     def submit(self):
         self.selected_orders = [cb.text() for cb in self.checkboxes if cb.isChecked()]
-        self.products = createProductBlocks(self.po_df, self.selected_orders)
+        self.products = createProductBlocks(self.po_index, self.selected_orders)
         self.accept()
     
     def get_products(self):
@@ -0,0 +1,130 @@
+import math
+from collections import OrderedDict
+import numpy as np
+
+# Grid steps per inch. Product widths are given to at most three decimals, so at
+# this resolution every width is an exact multiple of the grid.
+GRID_RESOLUTION = 1000
+
+def _split_bounded(weights, values, bounds):
+    """
+    Binary splitting: each item with bound b becomes 0/1 items of 1, 2, 4, ... and
+    the remainder copies, so any count 0..b is a sum of a subset of them.
+    Returns (item index, copies, weight, value) for each 0/1 item.
+    """
+    split = []
+    for i, (w, v, b) in enumerate(zip(weights, values, bounds)):
+        copies = 1
+        while b > 0:
+            take = min(copies, b)
+            split.append((i, take, w * take, v * take))
+            b -= take
+            copies *= 2
+    return split
+
+def bounded_knapsack(capacity, widths, values, bounds, resolution=GRID_RESOLUTION):
+    """
+    Pattern maximizing sum values_i * a_i subject to sum widths_i * a_i <= capacity
+    and 0 <= a_i <= bounds_i, solved exactly by dynamic programming over a width
+    grid of `resolution` steps per inch.
+
+    Widths are rounded to the nearest grid step and the capacity is rounded down,
+    so at a resolution matching the widths' precision the result is the optimal
+    pattern. Items with a non-positive value or a width above the capacity are
+    never used. Returns (pattern tuple, value).
+    """
+    n = len(widths)
+    pattern = [0] * n
+    cap = int(math.floor(capacity * resolution + 1e-6))
+    weights = [int(round(w * resolution)) for w in widths]
+    items = [i for i in range(n)
+             if values[i] > 0 and bounds[i] > 0 and 0 < weights[i] <= cap]
+    if not items:
+        return tuple(pattern), 0.0
+
+    # Copies beyond what fits in the capacity can never be used.
+    split = _split_bounded([weights[i] for i in items], [values[i] for i in items],
+                           [min(int(bounds[i]), cap // weights[i]) for i in items])
+
+    # best[c] = best value with total weight <= c; keep[k, c] records whether 0/1
+    # item k is taken in the best solution for capacity c after considering item k.
+    best = np.zeros(cap + 1)
+    keep = np.zeros((len(split), cap + 1), dtype=bool)
+    for k, (_, _, w, v) in enumerate(split):
+        candidate = best[:cap + 1 - w] + v
+        take = candidate > best[w:] + 1e-12
+        keep[k, w:] = take
+        best[w:] = np.where(take, candidate, best[w:])
+
+    c = cap
+    for k in range(len(split) - 1, -1, -1):
+        if keep[k, c]:
+            idx, copies, w, _ = split[k]
+            pattern[items[idx]] += copies
+            c -= w
+    return tuple(pattern), sum(values[i] * pattern[i] for i in range(n))
+
+########################################
+# Pattern Cache
+########################################
+class PatternCache:
+    """
+    Memoized bounded_knapsack for a fixed set of widths and values, keyed on
+    (capacity, bounds) with least-recently-used eviction.
+
+    Besides exact repeats, a cached pattern is reused when it is provably optimal
+    for the new bounds as well:
+      - the new bounds are within the cached bounds and still admit the cached
+        pattern (the feasible set shrank but kept the optimum), or
+      - the values are the widths and the cached pattern fills the capacity
+        grid exactly, so no pattern can use more width.
+
+    hits, dominated_hits and misses count the three outcomes.
+    """
+
+    def __init__(self, widths, values=None, maxsize=256, resolution=GRID_RESOLUTION):
+        self.widths = list(widths)
+        self.values = list(widths if values is None else values)
+        self.maxsize = maxsize
+        self.resolution = resolution
+        self._fill_optimal = values is None
+        self._weights = [int(round(w * resolution)) for w in self.widths]
+        self._entries = OrderedDict()  # (capacity, bounds) -> (pattern, value)
+        self._by_capacity = {}         # capacity -> set of bounds cached for it
+        self.hits = 0
+        self.dominated_hits = 0
+        self.misses = 0
+
+    def solve(self, capacity, bounds):
+        """An optimal pattern for bounded_knapsack(capacity, widths, values, bounds), and its value."""
+        bounds = tuple(int(b) for b in bounds)
+        key = (capacity, bounds)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+        cap = int(math.floor(capacity * self.resolution + 1e-6))
+        for cached in self._by_capacity.get(capacity, ()):
+            pattern, value = self._entries[(capacity, cached)]
+            if any(a > b for a, b in zip(pattern, bounds)):
+                continue
+            within = all(b <= c for b, c in zip(bounds, cached))
+            filled = self._fill_optimal and sum(
+                w * a for w, a in zip(self._weights, pattern)) == cap
+            if within or filled:
+                self._entries.move_to_end((capacity, cached))
+                self.dominated_hits += 1
+                return pattern, value
+
+        self.misses += 1
+        result = bounded_knapsack(capacity, self.widths, self.values, bounds, self.resolution)
+        self._entries[key] = result
+        self._by_capacity.setdefault(capacity, set()).add(bounds)
+        if len(self._entries) > self.maxsize:
+            (old_capacity, old_bounds), _ = self._entries.popitem(last=False)
+            self._by_capacity[old_capacity].discard(old_bounds)
+        return result
+
+    def stats(self):
+        return {'hits': self.hits, 'dominated_hits': self.dominated_hits, 'misses': self.misses}
@@ -0,0 +1,87 @@
+import numpy as np
+from backends import SparseModel, solve_model
+from knapsack import bounded_knapsack
+from utils import block_classes
+
+EPS = 1e-9  # Tolerance on width comparisons
+
+def waste_lower_bound(masters, products, backend="auto"):
+    """
+    Lower bound on the overall waste percentage (as computed by calculateWaste) of
+    any plan that cuts every product in `products` from the blocks of `masters`.
+    Returns None when some product fits no block, as then no plan exists.
+
+    Two bounds are combined, both over block classes (same width and length):
+      - Knapsack bound: a block of width W holds at most F(W), its best bounded
+        knapsack fill, so its waste is at least (W - F) / F. The overall waste is a
+        weighted average of block wastes and cannot be below the smallest one.
+      - LP bound: the fractional assignment minimizing waste when each class
+        holds at most F per block, n blocks, and demand is met exactly. Waste is a
+        ratio of master MSI to product MSI, so the LP is solved in the
+        Charnes-Cooper form of that ratio.
+    The LP bound is at least the knapsack bound; the latter is kept in case the
+    LP cannot be solved.
+    """
+    demand = {}
+    for p in products:
+        demand[p[0]] = demand.get(p[0], 0) + 1
+    widths = np.array(sorted(demand, reverse=True), dtype=float)
+    d = np.array([demand[w] for w in widths], dtype=float)
+    classes = block_classes(masters)
+    if len(widths) == 0 or not classes:
+        return None
+    W = np.array([key[0] for key in classes], dtype=float)
+    k = np.array([key[1] for key in classes], dtype=float) * 12 / 1000
+    n = np.array([len(blocks) for blocks in classes.values()], dtype=float)
+
+    fits = widths[None, :] <= W[:, None] + EPS
+    if not fits.any(axis=0).all():
+        return None
+    fill = np.array([bounded_knapsack(W[c] + EPS, list(widths), list(widths), list(d))[1]
+                     for c in range(len(W))])
+    usable = fill > 0
+    knapsack_bound = float(np.min((W[usable] - fill[usable]) / fill[usable])) * 100
+    lp_bound = _ratio_lp_bound(W, k, n, fill, widths, d, fits & usable[:, None], backend)
+    bound = knapsack_bound if lp_bound is None else max(knapsack_bound, lp_bound)
+    # Rounding noise of the LP is not a real bound.
+    return bound if bound > EPS else 0.0
+
+def _ratio_lp_bound(W, k, n, fill, widths, d, fits, backend):
+    """
+    min (sum_c k_c W_c y_c) / (sum_ci k_c w_i x_ci) - 1 over x, y >= 0 with
+    sum_c x_ci = d_i, sum_i w_i x_ci <= F_c y_c and y_c <= n_c. Substituting
+    x' = t x, y' = t y with t = 1 / (product MSI) makes it the LP
+
+        min  sum_c k_c W_c y'_c
+        s.t. sum_ci k_c w_i x'_ci = 1,  sum_c x'_ci = d_i t,
+             sum_i w_i x'_ci <= F_c y'_c,  y'_c <= n_c t.
+    """
+    cls, typ = np.nonzero(fits)
+    n_x, n_c, n_t = len(cls), len(W), len(widths)
+    x_cols = np.arange(n_x)
+    y_cols = n_x + np.arange(n_c)
+    t_col = n_x + n_c
+
+    model = SparseModel("WasteLowerBound")
+    model.add_vars(np.zeros(n_x))
+    model.add_vars(k * W)
+    model.add_vars([0.0])
+    # Product MSI normalized to 1.
+    model.add_rows(np.zeros(n_x), x_cols, k[cls] * widths[typ], 1.0, 1.0)
+    # Demand met exactly, in units of t.
+    model.add_rows(np.concatenate([typ, np.arange(n_t)]),
+                   np.concatenate([x_cols, np.full(n_t, t_col)]),
+                   np.concatenate([np.ones(n_x), -d]), 0.0, 0.0, count=n_t)
+    # Fill of each class within its best knapsack fill per block.
+    model.add_rows(np.concatenate([cls, np.arange(n_c)]),
+                   np.concatenate([x_cols, y_cols]),
+                   np.concatenate([widths[typ], -fill]), -np.inf, 0.0, count=n_c)
+    # At most n_c blocks of each class.
+    model.add_rows(np.concatenate([np.arange(n_c), np.arange(n_c)]),
+                   np.concatenate([y_cols, np.full(n_c, t_col)]),
+                   np.concatenate([np.ones(n_c), -n]), -np.inf, 0.0, count=n_c)
+
+    result = solve_model(model, backend=backend, integer=False)
+    if result['objective'] is None:
+        return None
+    return max((result['objective'] - 1) * 100, 0.0)
@@ -1,7 +1,106 @@
-import pulp
+import time
+import numpy as np
+from profiling import NULL_TIMER
+from utils import block_classes
+from backends import SparseModel, solve_model
+from compatibility import CompatibilityIndex
 
-def optimize_assignment(masters, product_list):
+# Maximum number of cutting patterns enumerated for the block-class model. Past this,
+# the per-block model is used instead.
+PATTERN_LIMIT = 50000
+EPS = 1e-9  # Tolerance on pattern width sums
+
+def optimize_assignment(masters, product_list, time_limit=None, timer=None, aggregate=True,
+                        gap_rel=None, threads=None, warm_start=None, stats=None, backend="auto",
+                        len_tol=None, deadline=None):
+    """
+    Assign product types to master roll blocks with a MILP minimizing unused MSI.
+    If `time_limit` (seconds) is given, the solver stops there and the best
+    incumbent found so far is mapped back into `masters`. A `deadline`
+    (time.time() value) caps the solve at the time left once the model is built,
+    with at least one second. An optional PhaseTimer records model building,
+    solving and result mapping.
+
+    With `aggregate` (the default), interchangeable blocks (same master width and
+    allocated length) are grouped into classes and the model chooses how many
+    blocks of each class are cut with each pattern, which removes the symmetry of
+    the per-block model. If the patterns cannot be enumerated within PATTERN_LIMIT,
+    the per-block model is used.
+
+    Only block/type pairs a CompatibilityIndex allows are modelled: the product
+    width must fit and, with `len_tol`, the product length must be within the
+    same window the SA respects (types that would be left short of blocks keep
+    every block they fit in). Counts are bounded by floor(W / width) and demand.
+
+    Solver settings:
+      - backend: "auto", "highs", "scipy" or "pulp" (see backends.resolve_backend).
+      - gap_rel: relative gap at which the solver stops (None = prove optimality).
+      - threads: solver threads (None = solver default).
+      - warm_start: masters with an existing assignment (best-fit heuristic or a
+        previous solve over the same inventory). HiGHS starts from it; with the
+        other backends it is returned when the solver finds nothing better (see
+        backends.solve_model). Products it places on pairs the
+        model does not have are moved best-fit onto compatible blocks first.
+      - stats: optional dict filled with the backend, status, objective, best bound
+        and relative gap.
+    """
+    timer = timer or NULL_TIMER
+    with timer.span("milp.build"):
+        product_types, demand = _aggregate_products(product_list)
+        counts = _warm_start_counts(warm_start, product_types) if warm_start is not None else None
+        first = np.cumsum([0] + [len(m['Products']) for m in masters])
+        patterns = None
+        if aggregate:
+            classes = block_classes(masters)
+            compat = _compatibility(list(classes), product_types, demand, len_tol,
+                                    block_count=[len(blocks) for blocks in classes.values()])
+            patterns = _class_patterns(classes, product_types, demand, compat=compat)
+        start = None
+        if patterns is not None:
+            model, offsets = _build_class_model(classes, patterns, product_types, demand)
+            if counts is not None:
+                # Every block takes the compatible pairs of its class.
+                block_class = np.zeros(len(counts), dtype=int)
+                for c, blocks in enumerate(classes.values()):
+                    block_class[[first[m_idx] + b_idx for m_idx, b_idx in blocks]] = c
+                counts = _compatible_counts(counts, compat.mask[block_class], masters, product_types, demand)
+            if counts is not None:
+                start = _warm_start_classes(counts, classes, patterns, offsets, first, model.num_vars)
+        else:
+            model, blocks, types, pairs = _build_model(masters, product_types, demand, len_tol)
+            if counts is not None:
+                mask = np.zeros(counts.shape, dtype=bool)
+                mask[pairs] = True
+                counts = _compatible_counts(counts, mask, masters, product_types, demand)
+            if counts is not None:
+                start = _warm_start_blocks(counts, pairs)
+    
+    # Solve the MILP.
+    if deadline is not None:
+        # Model building counts against the budget, so take the time left only now.
+        remaining = max(deadline - time.time(), 1)
+        time_limit = remaining if time_limit is None else min(time_limit, remaining)
+    with timer.span("milp.solve"):
+        result = solve_model(model, backend=backend, time_limit=time_limit, gap_rel=gap_rel,
+                             threads=threads, warm_start=start)
+    solve_stats = {key: result[key] for key in ('backend', 'status', 'objective', 'best_bound', 'gap')}
+    print("Solver:", solve_stats['backend'],
+          "| status:", solve_stats['status'],
+          "| objective:", solve_stats['objective'],
+          "| best bound:", solve_stats['best_bound'],
+          "| gap:", solve_stats['gap'])
+    if stats is not None:
+        stats.update(solve_stats)
     
+    with timer.span("milp.map_solution"):
+        if patterns is not None:
+            _map_class_solution(masters, classes, patterns, offsets, result['x'], product_types)
+        else:
+            _map_solution(masters, result['x'], blocks, types, pairs, product_types)
+    return masters
+
+def _aggregate_products(product_list):
+    """Group the PO product dicts into types keyed on (width, length) with their total demand."""
     aggregated = {}
     for prod in product_list:
         width = float(prod["Width"])
@@ -17,6 +116,30 @@ def optimize_assignment(masters, product_list):
     
     demand = {t: aggregated_products[t]["demand"] for t in types}
     product_types = {t: aggregated_products[t] for t in types}
+    return product_types, demand
+
+def _compatibility(keys, product_types, demand, len_tol, block_count=None):
+    """
+    CompatibilityIndex of the product types over blocks given as (Width, Length)
+    keys. Product type lengths are in thousands of feet, block lengths in feet.
+    """
+    types = list(product_types)
+    compat = CompatibilityIndex([W for W, L in keys], [L for W, L in keys],
+                                [product_types[t]["width"] for t in types],
+                                [product_types[t]["length"] * 1000 for t in types],
+                                len_tol=len_tol, demand=[demand[t] for t in types],
+                                block_count=block_count)
+    if compat.relaxed_types:
+        print(f"Length window relaxed for {len(compat.relaxed_types)} product type(s) short of blocks.")
+    return compat
+
+def _build_model(masters, product_types, demand, len_tol=None):
+    """
+    Per-block model: x[i, t] = number of products of type t cut from block i, one
+    column per compatible (i, t) pair in `pairs`, and a binary y[i] per block
+    (after the x columns) marking it used.
+    """
+    types = list(product_types)
     
     # Step 2: Build a list of blocks.
     # For each master, record its width (W) and its allocated length (L)
@@ -29,52 +152,268 @@ def optimize_assignment(masters, product_list):
             blocks.append((m_idx, b_idx, W, L))
     
     B = len(blocks)
+    widths = np.array([product_types[t]["width"] for t in types], dtype=float)
+    W = np.array([block[2] for block in blocks], dtype=float)
+    k = np.array([block[3] for block in blocks], dtype=float) * 12 / 1000
+    compat = _compatibility([(block[2], block[3]) for block in blocks], product_types, demand, len_tol)
+    pairs = compat.pairs()
+    block_idx, type_idx = pairs
+    n_x = len(block_idx)
+    x_cols = np.arange(n_x)
     
-    # Step 3: Build the MILP model.
-    prob = pulp.LpProblem("Aggregated_RollAssignment", pulp.LpMinimize)
-    
-    # Decision variables: x[(i, t)] = number of products of type t assigned to block i.
-    x = pulp.LpVariable.dicts("x", ((i, t) for i in range(B) for t in types), lowBound=0, cat="Integer")
-    
-    # Binary variables: y[i] indicates whether block i is used.
-    y = pulp.LpVariable.dicts("y", (i for i in range(B)), cat="Binary")
+    # Step 3: Build the MILP model as sparse arrays.
+    # Objective: Minimize total unused MSI across all blocks.
+    # For block i (with master parameters W and L), available MSI = (L*W*12)/1000 and used MSI =
+    # (L*12)/1000 * sum_{t}(product_types[t]["width"] * x[(i,t)]). Thus, unused MSI =
+    # (L*12)/1000 * (W*y[i] - sum_{t}(product_types[t]["width"] * x[(i,t)])).
+    model = SparseModel("Aggregated_RollAssignment")
+    model.add_vars(-k[block_idx] * widths[type_idx], lower=0, upper=compat.bounds[pairs], integer=True)
+    model.add_vars(k * W, lower=0, upper=1, integer=True)
     
     # Constraint 1: For each product type, total assigned equals its aggregated demand.
-    for t in types:
-        prob += pulp.lpSum(x[(i, t)] for i in range(B)) == demand[t], f"Demand_{t}"
+    demand_vec = np.array([demand[t] for t in types], dtype=float)
+    model.add_rows(type_idx, x_cols, np.ones(n_x), demand_vec, demand_vec)
     
     # Constraint 2: For each block, total product width (in raw units) does not exceed master width.
     # (Because if we multiply by (L*12/1000), the capacity in MSI is (L*W*12)/1000 and consumption is (L*width*12)/1000.)
-    for i in range(B):
-        W = blocks[i][2]
-        prob += pulp.lpSum(product_types[t]["width"] * x[(i, t)] for t in types) <= W * y[i], f"Capacity_{i}"
-    
-    # Objective: Minimize total unused MSI across all blocks.
-    # For block i (with master parameters W and L), available MSI = (L*W*12)/1000 and used MSI =
-    # (L*12)/1000 * sum_{t}(product_types[t]["width"] * x[(i,t)]). Thus, unused MSI =
-    # (L*12)/1000 * (W*y[i] - sum_{t}(product_types[t]["width"] * x[(i,t)])).
-    obj = pulp.lpSum(((blocks[i][3] * 12)/1000) * (blocks[i][2] * y[i] - 
-             pulp.lpSum(product_types[t]["width"] * x[(i, t)] for t in types)) for i in range(B))
-    prob += obj, "Total_Unused_MSI"
+    model.add_rows(np.concatenate([block_idx, np.arange(B)]),
+                   np.concatenate([x_cols, n_x + np.arange(B)]),
+                   np.concatenate([widths[type_idx], -W]),
+                   -np.inf, 0.0, count=B)
+    return model, blocks, types, pairs
+
+########################################
+# Block-Class Model
+########################################
+def _enumerate_patterns(capacity, widths, bounds, limit):
+    """
+    Every non-empty cutting pattern (count per product type) whose total width fits
+    in `capacity`, with counts bounded by `bounds`. Returns None past `limit` patterns.
+    """
+    n = len(widths)
+    if n == 0:
+        return []
+
+    def most(t, remaining):
+        return min(bounds[t], int((remaining + EPS) // widths[t])) if widths[t] > 0 else bounds[t]
+
+    # Narrowest width among the types from t on that can take a copy at all.
+    narrowest = [float('inf')] * (n + 1)
+    for t in range(n - 1, -1, -1):
+        narrowest[t] = min(narrowest[t + 1], widths[t]) if bounds[t] > 0 else narrowest[t + 1]
+
+    # Depth-first over the types, largest count first, kept iterative so a class
+    # with many product types cannot exhaust the recursion limit. Once nothing
+    # after type t fits, the remaining counts are all 0 and the pattern is complete.
+    patterns = []
+    counts = [0] * n
+    remaining = [0.0] * (n + 1)
+    remaining[0] = capacity
+    counts[0] = most(0, capacity)
+    t = 0
+    while True:
+        remaining[t + 1] = remaining[t] - counts[t] * widths[t]
+        if t + 1 < n and remaining[t + 1] + EPS >= narrowest[t + 1]:
+            t += 1
+            counts[t] = most(t, remaining[t])
+            continue
+        if any(counts):
+            patterns.append(tuple(counts))
+            if len(patterns) > limit:
+                return None
+        # Back up to the deepest type that can still take one fewer copy.
+        while t >= 0 and counts[t] == 0:
+            t -= 1
+        if t < 0:
+            return patterns
+        counts[t] -= 1
+
+def _class_patterns(classes, product_types, demand, limit=None, compat=None):
+    """
+    Patterns for each class, with counts bounded by the class row of `compat` (or by
+    demand alone). Classes of equal width and bounds share one list; None if too many.
+    """
+    limit = PATTERN_LIMIT if limit is None else limit
+    types = list(product_types)
+    widths = [product_types[t]["width"] for t in types]
+    shared = {}
+    result = {}
+    total = 0
+    for c, (W, L) in enumerate(classes):
+        if compat is not None:
+            bounds = tuple(int(b) for b in compat.bounds[c])
+        else:
+            bounds = tuple(int(demand[t]) for t in types)
+        if (W, bounds) not in shared:
+            shared[(W, bounds)] = _enumerate_patterns(W, widths, bounds, limit - total)
+            if shared[(W, bounds)] is None:
+                return None
+            total += len(shared[(W, bounds)])
+        result[(W, L)] = shared[(W, bounds)]
+    return result
+
+def _build_class_model(classes, patterns, product_types, demand):
+    """
+    z[(c, p)] = number of blocks of class c cut with pattern p, at most the number
+    of blocks in the class. Unused blocks cost nothing, as with y[i] = 0 in the
+    per-block model. Columns are laid out class by class; returns the model and
+    the first column of each class.
+    """
+    types = list(product_types)
+    widths = np.array([product_types[t]["width"] for t in types], dtype=float)
+    demand_vec = np.array([demand[t] for t in types], dtype=float)
+    model = SparseModel("BlockClass_RollAssignment")
+    # Classes can share their pattern list, so convert each list once.
+    matrices = {}
+    offsets = []
+    block_rows, demand_rows, demand_cols, demand_vals = [], [], [], []
+    for c, (W, L) in enumerate(classes):
+        if id(patterns[(W, L)]) not in matrices:
+            matrices[id(patterns[(W, L)])] = np.array(patterns[(W, L)], dtype=float).reshape(-1, len(types))
+        P = matrices[id(patterns[(W, L)])]
+        n_blocks = len(classes[(W, L)])
+        # Objective: unused MSI of every cut block, (L*12)/1000 * (W - pattern width).
+        first = model.add_vars(((L * 12) / 1000) * (W - P @ widths), lower=0, upper=n_blocks, integer=True)
+        offsets.append(first)
+        # Each class has a limited number of blocks.
+        block_rows.append(np.full(len(P), c))
+        # For each product type, total cut equals its aggregated demand.
+        p_idx, t_idx = np.nonzero(P)
+        demand_rows.append(t_idx)
+        demand_cols.append(first + p_idx)
+        demand_vals.append(P[p_idx, t_idx])
     
-    # Solve the MILP.
-    prob.solve()
-    print("Solver Status:", pulp.LpStatus[prob.status])
+    columns = np.arange(model.num_vars)
+    model.add_rows(np.concatenate(block_rows) if block_rows else [], columns, np.ones(len(columns)),
+                   -np.inf, [len(blocks) for blocks in classes.values()])
+    if demand_rows:
+        model.add_rows(np.concatenate(demand_rows), np.concatenate(demand_cols), np.concatenate(demand_vals),
+                       demand_vec, demand_vec)
+    else:
+        model.add_rows([], [], [], demand_vec, demand_vec)
+    return model, offsets
+
+def _map_class_solution(masters, classes, patterns, offsets, x, product_types):
+    """Disaggregate the pattern counts back onto concrete blocks, class by class."""
+    for master in masters:
+        for b in range(len(master['Products'])):
+            master['Products'][b] = []
+    # No values means the solver stopped on the time limit without an incumbent.
+    if x is None:
+        return
     
+    types = list(product_types)
+    product_tuples = [(float(product_types[t]["width"]),
+                       float(product_types[t]["length"]),
+                       float(product_types[t]["msi"])) for t in types]
+    counts = np.rint(x).astype(int)
+    for c, key in enumerate(classes):
+        free_blocks = iter(classes[key])
+        for p in np.flatnonzero(counts[offsets[c]:offsets[c] + len(patterns[key])] > 0):
+            for _ in range(counts[offsets[c] + p]):
+                m_idx, b_idx = next(free_blocks)
+                block = masters[m_idx]['Products'][b_idx]
+                for t, count in zip(types, patterns[key][p]):
+                    block.extend([product_tuples[t]] * count)
+
+def _map_solution(masters, x, blocks, types, pairs, product_types):
     # Step 4: Map the solution back into the masters structure.
     # Clear any existing product assignments.
     for master in masters:
         for b in range(len(master['Products'])):
             master['Products'][b] = []
+    # No values means the solver stopped on the time limit without an incumbent.
+    if x is None:
+        return
     
     # For each block, assign products according to the solved decision variables.
-    for i in range(B):
+    block_idx, type_idx = pairs
+    counts = np.rint(x[:len(block_idx)]).astype(int)
+    for j in np.flatnonzero(counts > 0):
+        i, r = block_idx[j], type_idx[j]
         m_idx, b_idx, W, L = blocks[i]
-        for t in types:
-            count = int(pulp.value(x[(i, t)]))
-            product_tuple = (float(product_types[t]["width"]),
-                             float(product_types[t]["length"]),
-                             float(product_types[t]["msi"]))
-            masters[m_idx]['Products'][b_idx].extend([product_tuple] * count)
-    
-    return masters
+        t = types[r]
+        product_tuple = (float(product_types[t]["width"]),
+                         float(product_types[t]["length"]),
+                         float(product_types[t]["msi"]))
+        masters[m_idx]['Products'][b_idx].extend([product_tuple] * counts[j])
+
+########################################
+# Warm Start
+########################################
+def _type_lookup(product_types):
+    """
+    Product type of a product tuple, keyed on (width, length). SA-style tuples carry
+    the length in mm (x1000), MILP-mapped tuples the raw length, so both are keyed.
+    """
+    lookup = {}
+    for t, p in product_types.items():
+        lookup[(p["width"], p["length"])] = t
+        lookup[(p["width"], p["length"] * 1000)] = t
+    return lookup
+
+def _block_type_counts(block, lookup, num_types):
+    """Count per product type of the products in one block, or None on an unknown product."""
+    counts = [0] * num_types
+    for prod in block:
+        t = lookup.get((float(prod[0]), float(prod[1])))
+        if t is None:
+            return None
+        counts[t] += 1
+    return tuple(counts)
+
+def _warm_start_classes(counts, classes, patterns, offsets, first, num_vars):
+    """
+    Starting z values: how many blocks of each class the warm start counts cut
+    with each pattern. `first` is the row of each master's first block in `counts`.
+    """
+    start = np.zeros(num_vars)
+    for c, key in enumerate(classes):
+        index = {pattern: p for p, pattern in enumerate(patterns[key])}
+        for m_idx, b_idx in classes[key]:
+            pattern = tuple(int(n) for n in counts[first[m_idx] + b_idx])
+            p = index.get(pattern)
+            if p is not None:
+                start[offsets[c] + p] += 1
+    return start
+
+def _warm_start_counts(warm_start, product_types):
+    """
+    Products per (block, type) in the warm start, blocks in master order. Blocks
+    holding a product of an unknown type count as empty.
+    """
+    lookup = _type_lookup(product_types)
+    counts = []
+    for master in warm_start:
+        for block in master['Products']:
+            block_counts = _block_type_counts(block, lookup, len(product_types))
+            counts.append(block_counts if block_counts is not None else (0,) * len(product_types))
+    return np.array(counts, dtype=float).reshape(-1, len(product_types))
+
+def _compatible_counts(counts, mask, masters, product_types, demand):
+    """
+    Warm start counts using only the (block, type) pairs in `mask`. Products the
+    warm start placed on other pairs (the best-fit heuristic ignores product
+    length) are taken off and placed again, widest first, on the compatible block
+    with the least width left that holds them. None if some product fits nowhere.
+    """
+    types = list(product_types)
+    widths = np.array([product_types[t]["width"] for t in types], dtype=float)
+    remaining = np.array([float(m['Width']) for m in masters for _ in m['Products']])
+    counts = np.where(mask, counts, 0)
+    remaining -= counts @ widths
+    missing = np.array([demand[t] for t in types], dtype=float) - counts.sum(axis=0)
+    for r in np.argsort(-widths):
+        for _ in range(int(missing[r])):
+            candidates = np.flatnonzero(mask[:, r] & (remaining + EPS >= widths[r]))
+            if len(candidates) == 0:
+                print("Warm start dropped: a product fits no compatible block.")
+                return None
+            i = candidates[np.argmin(remaining[candidates])]
+            counts[i, r] += 1
+            remaining[i] -= widths[r]
+    return counts
+
+def _warm_start_blocks(counts, pairs):
+    """Starting x and y values of the per-block model from the warm start counts."""
+    return np.concatenate([counts[pairs], (counts.sum(axis=1) > 0).astype(float)])
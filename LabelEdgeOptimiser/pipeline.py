@@ -0,0 +1,501 @@
+# pipeline.py
+import copy
+import multiprocessing
+import queue
+import time
+import traceback
+from simulated_annealing import (
+    process_selected_pos,
+    filter_inventory,
+    run_restarts,
+    initialSolHeuristic,
+    calculateWaste,
+    resolve_workers,
+    is_valid_solution,
+    sa_master_template,
+    masters_from_template,
+)
+from utils import createMasterDict
+from lower_bound import waste_lower_bound
+from milp import optimize_assignment
+from column_gen import optimize_assignment_column_generation, optimize_assignment_gilmore_gomory
+from profiling import NULL_TIMER
+
+def solve_instance(inv_df, selected_pos, label_code, algorithm="SA", len_tol=0.1,
+                   num_restarts=20, iterations=2000, options=None,
+                   progress=None, is_canceled=None, timer=None, info=None, on_incumbent=None):
+    """
+    Run one optimization without any GUI dependency. Used by SolveWorker and by
+    the benchmark suite.
+
+    Parameters:
+      - inv_df: filtered inventory DataFrame (as returned by filter_inv_df).
+      - selected_pos: product strings in "Paper/Width/Length/Nb/msi" format.
+      - label_code: list of paper codes to take rolls from.
+      - algorithm: "SA", "MILP", "COLGEN", "GILMORE_GOMORY" or "PORTFOLIO"
+                   (see solve_portfolio).
+      - options: dict of [Optimization] settings (see SolveWorker).
+      - progress: optional callable receiving an int percentage.
+      - is_canceled: optional callable; when it returns True the solve stops.
+      - timer: optional PhaseTimer collecting a span per phase.
+      - info: optional dict filled with solver statistics: the overall waste, the
+              waste lower bound of the instance (see lower_bound) and the gap
+              between them in waste points, plus for MILP its status, objective,
+              best_bound and gap. A decomposed solve adds one entry per paper
+              under "subproblems".
+      - on_incumbent: optional callable receiving (masters, waste) whenever the
+                      solve has a better plan: after each improving SA restart,
+                      otherwise once at the end.
+
+    With the "decompose_by_paper" option (default True), an order spanning several
+    papers is split into one subproblem per paper (see solve_by_paper).
+
+    Returns the best masters found, or None if nothing was found or the solve
+    was canceled.
+    """
+    options = options or {}
+    progress = progress or (lambda percent: None)
+    timer = timer or NULL_TIMER
+    info = info if info is not None else {}
+    time_limit = options.get("time_limit", 0)
+    deadline = time.time() + time_limit if time_limit > 0 else None
+
+    if algorithm.upper() == "PORTFOLIO":
+        return solve_portfolio(inv_df, selected_pos, label_code, len_tol=len_tol,
+                               num_restarts=num_restarts, iterations=iterations, options=options,
+                               deadline=deadline, progress=progress, is_canceled=is_canceled,
+                               timer=timer, info=info)
+
+    if options.get("decompose_by_paper", True) and len(label_code) > 1:
+        groups = split_by_paper(selected_pos, label_code)
+        if groups is None:
+            print("Some products name a paper that is not selected; solving all papers together.")
+        elif groups:
+            masters = solve_by_paper(inv_df, groups, algorithm=algorithm, len_tol=len_tol,
+                                     num_restarts=num_restarts, iterations=iterations, options=options,
+                                     deadline=deadline, progress=progress, is_canceled=is_canceled,
+                                     timer=timer, info=info)
+            _report_incumbent(on_incumbent, masters)
+            return masters
+
+    with timer.span("parse_products"):
+        products, total_msi = process_selected_pos(selected_pos)
+        keys = ['Paper', 'Width', 'Length', 'Nb', 'msi']
+        products_dict = [dict(zip(keys, item.split('/'))) for item in selected_pos]
+    with timer.span("filter_inventory"):
+        filtered_inv = filter_inventory(inv_df, label_code)
+
+    print("Algorithm:", algorithm)
+    # Switch between optimization methods based on the algorithm flag.
+    if algorithm.upper() == "MILP":
+        with timer.span("create_master_dict"):
+            initial_masters = createMasterDict(inv_df=filtered_inv, prod_list_length=products[0][1])
+        _waste_bound(initial_masters, products, options, timer, info)
+        warm_start = None
+        if options.get("milp_warm_start", True):
+            # Best-fit assignment over the same blocks, handed to CBC as its first incumbent.
+            with timer.span("milp.warm_start"):
+                warm_start = initialSolHeuristic(copy.deepcopy(initial_masters), products)
+        masters = optimize_assignment(
+            initial_masters, products_dict,
+            deadline=deadline,
+            timer=timer,
+            gap_rel=options.get("milp_gap_rel") or None,
+            threads=options.get("milp_threads") or None,
+            warm_start=warm_start,
+            stats=info,
+            backend=options.get("backend", "auto"),
+            len_tol=len_tol,
+        )
+        progress(100)
+        _record_waste(masters, info)
+        _report_incumbent(on_incumbent, masters)
+        return masters
+
+    if algorithm.upper() == "COLGEN":
+        # Column Generation branch: use the column generation routine.
+        with timer.span("create_master_dict"):
+            initial_masters = createMasterDict(inv_df=filtered_inv, prod_list_length=products[0][1])
+        _waste_bound(initial_masters, products, options, timer, info)
+        masters = optimize_assignment_column_generation(initial_masters, products, deadline=deadline,
+                                                        timer=timer, len_tol=len_tol)
+        progress(100)
+        _record_waste(masters, info)
+        _report_incumbent(on_incumbent, masters)
+        return masters
+
+    if algorithm.upper() == "GILMORE_GOMORY":
+        # Column generation with a restricted master LP and dual-priced pricing knapsacks.
+        with timer.span("create_master_dict"):
+            initial_masters = createMasterDict(inv_df=filtered_inv, prod_list_length=products[0][1])
+        _waste_bound(initial_masters, products, options, timer, info)
+        masters = optimize_assignment_gilmore_gomory(initial_masters, products, deadline=deadline,
+                                                     timer=timer, backend=options.get("backend", "auto"),
+                                                     len_tol=len_tol)
+        progress(100)
+        _record_waste(masters, info)
+        _report_incumbent(on_incumbent, masters)
+        return masters
+
+    # Simulated Annealing branch: independent restarts, spread over a process pool.
+    with timer.span("create_master_dict"):
+        template = sa_master_template(filtered_inv, products)
+    bound = _waste_bound(masters_from_template(template), products, options, timer, info)
+    target_waste = None
+    if bound is not None and options.get("sa_gap_target", 0) > 0:
+        # Restarts stop once a plan is within the gap target of the bound.
+        target_waste = bound + options["sa_gap_target"]
+    best_overall_waste = float('inf')
+    best_overall_masters = None
+    restarts = run_restarts(
+        filtered_inv,
+        products,
+        total_msi,
+        num_restarts,
+        iterations,
+        len_tol,
+        workers=options.get("workers", 0),
+        batch_size=options.get("sa_batch_size", 0),
+        selection=options.get("sa_batch_selection", "boltzmann"),
+        deadline=deadline,
+        stall_iterations=options.get("stall_iterations", 0),
+        stall_restarts=options.get("stall_restarts", 0),
+        is_canceled=is_canceled,
+        target_waste=target_waste,
+        template=template,
+    )
+    with timer.span("sa.restarts"):
+        for restart, (candidate_masters, candidate_waste) in enumerate(restarts):
+            if candidate_waste < best_overall_waste:
+                best_overall_waste = candidate_waste
+                best_overall_masters = candidate_masters
+                if on_incumbent is not None:
+                    on_incumbent(candidate_masters, candidate_waste)
+            progress(int(100 * (restart + 1) / num_restarts))
+    if is_canceled and is_canceled():
+        return None
+    # Restarts may stop early on the time budget, stagnation or the gap target.
+    progress(100)
+    _record_waste(best_overall_masters, info)
+    return best_overall_masters
+
+def _report_incumbent(on_incumbent, masters):
+    if on_incumbent is not None and masters is not None:
+        on_incumbent(masters, calculateWaste(masters))
+
+def _waste_bound(masters, products, options, timer, info):
+    """Waste lower bound over the blocks a solver starts from, recorded in `info`."""
+    with timer.span("lower_bound"):
+        bound = waste_lower_bound(masters, products, backend=options.get("backend", "auto"))
+    print("Waste lower bound:", "none (a product fits no roll)" if bound is None else f"{bound:.3f}%")
+    info['waste_bound'] = bound
+    return bound
+
+def _record_waste(masters, info):
+    """Overall waste of the returned plan and its gap to the lower bound, in waste points."""
+    if masters is None:
+        return
+    info['waste'] = calculateWaste(masters)
+    if info.get('waste_bound') is not None:
+        info['waste_gap'] = max(info['waste'] - info['waste_bound'], 0.0)
+    print(f"Overall waste: {info['waste']:.3f}%"
+          + (f" (gap to lower bound: {info['waste_gap']:.3f} points)" if 'waste_gap' in info else ""))
+
+
+########################################
+# Decomposition by paper
+########################################
+def split_by_paper(selected_pos, label_code):
+    """
+    Group product strings by their Paper field: {code: [product strings]} in
+    `label_code` order, leaving out papers without products. Returns None when a
+    product names a paper that is not in `label_code`, as the products then
+    cannot be matched to their stock.
+    """
+    codes = {str(code).strip(): code for code in label_code}
+    groups = {code: [] for code in label_code}
+    for item in selected_pos:
+        paper = item.split('/')[0].strip()
+        if paper not in codes:
+            return None
+        groups[codes[paper]].append(item)
+    return {code: items for code, items in groups.items() if items}
+
+def _solve_paper(inv_df, code, selected_pos, algorithm, len_tol, num_restarts, iterations, options,
+                 deadline, is_canceled=None):
+    """Solve one paper's subproblem by its own `deadline`. Returns (masters, info)."""
+    if deadline is not None:
+        options = dict(options, time_limit=max(deadline - time.time(), 1))
+    sub_info = {}
+    start = time.time()
+    masters = solve_instance(inv_df, selected_pos, [code], algorithm=algorithm, len_tol=len_tol,
+                             num_restarts=num_restarts, iterations=iterations, options=options,
+                             is_canceled=is_canceled, info=sub_info)
+    sub_info['seconds'] = time.time() - start
+    return masters, sub_info
+
+def _paper_process(results, code, args):
+    """
+    Run _solve_paper(*args) in its own process and put ("done", code, masters, info)
+    or ("error", code, traceback, None) on the `results` queue.
+    """
+    try:
+        masters, sub_info = _solve_paper(*args)
+    except Exception:
+        results.put(("error", code, traceback.format_exc(), None))
+        return
+    results.put(("done", code, masters, sub_info))
+
+def _paper_deadline(deadline, waiting, concurrent):
+    """
+    Deadline of the next paper to start: the time left shared evenly over the
+    rounds still needed for the `waiting` papers (itself included) when
+    `concurrent` papers are solved at once.
+    """
+    if deadline is None:
+        return None
+    rounds = -(-waiting // concurrent)
+    return time.time() + max(deadline - time.time(), 0) / rounds
+
+def solve_by_paper(inv_df, groups, algorithm="SA", len_tol=0.1, num_restarts=20, iterations=2000,
+                   options=None, deadline=None, progress=None, is_canceled=None, timer=None, info=None):
+    """
+    Solve each paper's products on that paper's rolls only, then merge the results.
+
+    `groups` maps paper codes to product strings (see split_by_paper). Papers are
+    independent, so up to `workers` of them are solved at once, each in its own
+    process with an even share of the workers for its own solver (an SA pool of
+    that size). With one worker, or a single paper, they are solved in turn in
+    this process with every worker. The time left before `deadline` is split
+    over the papers still to solve, so a paper never takes the time of the ones
+    after it.
+
+    Returns the concatenated masters of every paper, or None if any paper has no
+    solution or the solve was canceled.
+    """
+    options = dict(options or {}, decompose_by_paper=False)
+    progress = progress or (lambda percent: None)
+    timer = timer or NULL_TIMER
+    total = resolve_workers(options.get("workers", 0))
+    concurrent = min(total, len(groups))
+    print(f"Decomposed into {len(groups)} papers:",
+          ", ".join(f"{code} ({len(items)} lines)" for code, items in groups.items()))
+
+    results = {}
+    if concurrent <= 1:
+        for done, (code, items) in enumerate(groups.items()):
+            if is_canceled and is_canceled():
+                return None
+            paper_deadline = _paper_deadline(deadline, len(groups) - done, 1)
+            with timer.span(f"paper.{code}"):
+                results[code] = _solve_paper(inv_df, code, items, algorithm, len_tol, num_restarts,
+                                             iterations, options, paper_deadline, is_canceled)
+            progress(int(100 * (done + 1) / len(groups)))
+        if is_canceled and is_canceled():
+            return None
+    else:
+        # Worker processes, not a pool: pool processes cannot start their own SA pools.
+        messages = multiprocessing.Queue()
+        waiting = list(groups.items())
+        shares = [total // concurrent + (slot < total % concurrent) for slot in range(concurrent)]
+        running = {}  # code -> (process, workers)
+        try:
+            with timer.span("paper.parallel"):
+                while waiting or running:
+                    while waiting and shares:
+                        paper_deadline = _paper_deadline(deadline, len(waiting), concurrent)
+                        code, items = waiting.pop(0)
+                        workers = shares.pop()
+                        args = (inv_df, code, items, algorithm, len_tol, num_restarts, iterations,
+                                dict(options, workers=workers), paper_deadline)
+                        process = multiprocessing.Process(target=_paper_process, name=f"paper-{code}",
+                                                          args=(messages, code, args))
+                        process.start()
+                        running[code] = (process, workers)
+                    if is_canceled and is_canceled():
+                        return None
+                    try:
+                        kind, code, payload, sub_info = messages.get(timeout=0.1)
+                    except queue.Empty:
+                        if any(process.is_alive() for process, _ in running.values()):
+                            continue
+                        try:
+                            # A process may have exited just after the timeout.
+                            kind, code, payload, sub_info = messages.get(timeout=1)
+                        except queue.Empty:
+                            print("Papers", ", ".join(map(str, running)), "stopped without a result.")
+                            return None
+                    process, workers = running.pop(code)
+                    process.join()
+                    shares.append(workers)
+                    if kind == "error":
+                        print(f"Paper {code} failed:\n{payload}")
+                        return None
+                    results[code] = (payload, sub_info)
+                    progress(int(100 * len(results) / len(groups)))
+        finally:
+            for process, _ in running.values():
+                process.terminate()
+            for process, _ in running.values():
+                process.join()
+            messages.close()
+
+    merged = []
+    for code in groups:
+        masters, _ = results[code]
+        if masters is None:
+            print(f"No solution found for paper {code}.")
+            return None
+        merged.extend(masters)
+    waste = calculateWaste(merged)
+    print(f"Overall waste over {len(groups)} papers: {waste:.3f}%")
+
+    if info is not None:
+        subproblems = {str(code): sub_info for code, (_, sub_info) in results.items()}
+        info['waste'] = waste
+        info['subproblems'] = subproblems
+        # The overall waste is a weighted average of the papers' wastes, so it is at
+        # least the smallest of their bounds.
+        bounds = [sub.get('waste_bound') for sub in subproblems.values()]
+        if all(b is not None for b in bounds):
+            info['waste_bound'] = min(bounds)
+            info['waste_gap'] = max(waste - info['waste_bound'], 0.0)
+        # MILP objectives and bounds add up over independent papers.
+        if all(sub.get('objective') is not None and sub.get('best_bound') is not None
+               for sub in subproblems.values()):
+            info['objective'] = sum(sub['objective'] for sub in subproblems.values())
+            info['best_bound'] = sum(sub['best_bound'] for sub in subproblems.values())
+            info['gap'] = abs(info['objective'] - info['best_bound']) / max(abs(info['objective']), 1e-9)
+    return merged
+
+
+########################################
+# Solver portfolio
+########################################
+PORTFOLIO_ENGINES = ("SA", "MILP", "COLGEN", "GILMORE_GOMORY")
+PROVEN_GAP = 1e-6  # Relative MILP gap treated as proven optimal
+
+def _race_engine(results, engine, inv_df, selected_pos, label_code, len_tol, num_restarts, iterations,
+                 options):
+    """
+    Run one portfolio engine in its own process. Every improving plan is put on the
+    `results` queue as ("incumbent", engine, masters, waste, seconds), followed by
+    ("done", engine, info, None, seconds) or ("error", engine, traceback, None, seconds).
+    """
+    start = time.time()
+
+    def report(masters, waste):
+        results.put(("incumbent", engine, masters, waste, time.time() - start))
+
+    info = {}
+    try:
+        solve_instance(inv_df, selected_pos, label_code, algorithm=engine, len_tol=len_tol,
+                       num_restarts=num_restarts, iterations=iterations, options=options,
+                       info=info, on_incumbent=report)
+    except Exception:
+        results.put(("error", engine, traceback.format_exc(), None, time.time() - start))
+        return
+    results.put(("done", engine, info, None, time.time() - start))
+
+def solve_portfolio(inv_df, selected_pos, label_code, len_tol=0.1, num_restarts=20, iterations=2000,
+                    options=None, deadline=None, progress=None, is_canceled=None, timer=None, info=None):
+    """
+    Race several engines on the same order and return the best plan any of them
+    found. Each engine in the "portfolio_engines" option (default: all of
+    PORTFOLIO_ENGINES) runs in its own process with a single worker and the same
+    deadline, and reports every improving plan back; the best valid one is kept.
+
+    The race ends when every engine has finished, when the MILP proves its plan
+    optimal, or at the deadline once a plan is known; engines still running are
+    then terminated. `info` receives the winning engine, the seconds it took to
+    produce the plan, its solver statistics, and a summary per engine under
+    "engines".
+    """
+    options = dict(options or {}, workers=1)
+    progress = progress or (lambda percent: None)
+    timer = timer or NULL_TIMER
+    engines = options.get("portfolio_engines") or PORTFOLIO_ENGINES
+    if isinstance(engines, str):
+        engines = [e.strip() for e in engines.split(',') if e.strip()]
+    engines = [e.upper() for e in engines if e.upper() in PORTFOLIO_ENGINES]
+    num_products = sum(int(float(item.split('/')[3])) for item in selected_pos)
+    print("Portfolio engines:", ", ".join(engines))
+
+    results = multiprocessing.Queue()
+    processes = {}
+    for engine in engines:
+        process = multiprocessing.Process(
+            target=_race_engine, name=f"portfolio-{engine}",
+            args=(results, engine, inv_df, selected_pos, label_code, len_tol, num_restarts, iterations,
+                  options))
+        process.start()
+        processes[engine] = process
+
+    best = None  # (waste, engine, masters, seconds)
+    summary = {engine: {'status': "running", 'waste': None, 'seconds': None} for engine in engines}
+    engine_info = {}
+    running = set(engines)
+    try:
+        with timer.span("portfolio.race"):
+            while running:
+                if is_canceled and is_canceled():
+                    return None
+                if deadline is not None and time.time() >= deadline and best is not None:
+                    print("Portfolio deadline reached; stopping", ", ".join(sorted(running)))
+                    break
+                try:
+                    kind, engine, payload, waste, seconds = results.get(timeout=0.1)
+                except queue.Empty:
+                    if any(processes[e].is_alive() for e in running):
+                        continue
+                    try:
+                        # An engine may have exited just after the timeout.
+                        kind, engine, payload, waste, seconds = results.get(timeout=1)
+                    except queue.Empty:
+                        # Engines that died without reporting (e.g. killed by the OS).
+                        for e in running:
+                            summary[e]['status'] = "failed"
+                        break
+                if kind == "incumbent":
+                    if not is_valid_solution(payload, num_products):
+                        continue
+                    summary[engine]['waste'] = waste
+                    summary[engine]['seconds'] = seconds
+                    if best is None or waste < best[0]:
+                        best = (waste, engine, payload, seconds)
+                        print(f"Portfolio incumbent: {engine} {waste:.3f}% after {seconds:.2f}s")
+                    continue
+                running.discard(engine)
+                progress(int(100 * (len(engines) - len(running)) / len(engines)))
+                if kind == "error":
+                    summary[engine]['status'] = "failed"
+                    print(f"Portfolio engine {engine} failed:\n{payload}")
+                    continue
+                summary[engine]['status'] = "finished"
+                engine_info[engine] = payload
+                gap = payload.get('gap')
+                if (gap is not None and gap <= PROVEN_GAP and best is not None and best[1] == engine):
+                    print(f"{engine} proved its plan optimal")
+                    summary[engine]['status'] = "optimal"
+                    break
+    finally:
+        for engine, process in processes.items():
+            if process.is_alive():
+                process.terminate()
+                if summary[engine]['status'] == "running":
+                    summary[engine]['status'] = "terminated"
+        for process in processes.values():
+            process.join()
+        results.close()
+
+    progress(100)
+    if best is None:
+        return None
+    waste, engine, masters, seconds = best
+    print(f"Portfolio winner: {engine} ({waste:.3f}% waste, {seconds:.2f}s)")
+    if info is not None:
+        info.update(engine_info.get(engine, {}))
+        info['engine'] = engine
+        info['engine_seconds'] = seconds
+        info['engines'] = summary
+    return masters
@@ -0,0 +1,87 @@
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+class PhaseTimer:
+    """
+    Collects named, possibly nested timing spans for one solve. Each span records
+    its parent span, start offset and duration in seconds.
+    """
+
+    def __init__(self):
+        self.spans = []
+        self._stack = []
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        parent = self._stack[-1] if self._stack else None
+        self._stack.append(name)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            self.spans.append({
+                'name': name,
+                'parent': parent,
+                'start': start - self._origin,
+                'duration': time.perf_counter() - start,
+            })
+
+    def as_dict(self):
+        return {'spans': sorted(self.spans, key=lambda s: s['start'])}
+
+    def summary(self):
+        """One line per span, indented by nesting depth."""
+        depth = {}
+        lines = []
+        for s in self.as_dict()['spans']:
+            depth[s['name']] = depth.get(s['parent'], -1) + 1
+            lines.append(f"{'  ' * depth[s['name']]}{s['name']}: {s['duration']:.3f}s")
+        return "\n".join(lines)
+
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+class _NullTimer:
+    """Stand-in used when the caller does not collect timings."""
+
+    def span(self, name):
+        return nullcontext()
+
+NULL_TIMER = _NullTimer()
+
+@contextmanager
+def profile_solve(enabled, out_dir="profiles", label="solve"):
+    """
+    When `enabled`, run the block under cProfile and tracemalloc and dump
+    <label>-<timestamp>.prof (open with pstats or snakeviz) and
+    <label>-<timestamp>-memory.txt (top allocation sites) into `out_dir`.
+    Only the current process is profiled, not SA pool workers.
+    """
+    if not enabled:
+        yield
+        return
+    os.makedirs(out_dir, exist_ok=True)
+    stem = os.path.join(out_dir, f"{label}-{time.strftime('%Y%m%d-%H%M%S')}")
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        profiler.dump_stats(stem + ".prof")
+        with open(stem + "-memory.txt", "w") as f:
+            f.write(f"Peak traced memory: {peak / 2**20:.3f} MB\n")
+            for stat in snapshot.statistics('lineno')[:50]:
+                f.write(f"{stat}\n")
+        print(f"Profile written to {stem}.prof")
@@ -1,7 +1,11 @@
-import copy, random, math
+import random, math, os, time, multiprocessing
+import numpy as np
 import pandas as pd
 from tqdm import tqdm
-from utils import print_masters_table, createMasterDict, process_selected_pos, filter_inventory
+from compact import CompactMasters
+from capacity_index import SlackIndex, FirstFitTree
+from compatibility import CompatibilityIndex
+from utils import print_masters_table, master_template, masters_from_template, process_selected_pos, filter_inventory
 
 ########################################
 # Helper: Check Validity of a Solution
@@ -14,8 +18,8 @@ def is_valid_solution(masters, num_products):
 # Waste Calculation (as Percentage)
 ########################################
 def calculateWaste(masters):
-    total_msi = 0
-    total_prod = 0
+    msi_terms = []
+    prod_terms = []
 
     for m in masters:
         block_wastes = []
@@ -36,37 +40,140 @@ def calculateWaste(masters):
                 waste = 0  # No assigned products → no waste to calculate
             
             block_wastes.append(waste)
-            total_msi += total_master
-            total_prod += total_block
+            msi_terms.append(total_master)
+            prod_terms.append(total_block)
 
         m['Waste'] = block_wastes
     
-    # Ensure we don't divide by zero
+    # Correctly rounded sums, so the incremental evaluation below can
+    # reproduce them exactly whatever order the blocks change in.
+    return _overall_waste(math.fsum(msi_terms), math.fsum(prod_terms))
+
+
+########################################
+# Incremental Waste Evaluation
+########################################
+# The SA state keeps the overall totals as exact integers counting units of
+# 2**-1074, the smallest float step, so every per-block term adds and
+# subtracts without rounding. Rounding a total once gives the same value as
+# calculateWaste's math.fsum, so a move evaluated incrementally scores exactly
+# what a full recomputation would, and no drift builds up over many moves.
+_EXACT_BITS = 1074
+_EXACT_UNIT = 1 << _EXACT_BITS
+
+# Number of accepted moves between two resynchronisations of the float
+# running totals in localSearch_batched.
+RESYNC_EVERY = 1000
+
+def _block_terms(m, block):
+    """
+    Return (master_msi, block_msi) for one block, computed exactly as
+    calculateWaste does. Empty blocks contribute nothing.
+    """
+    if not block:
+        return 0, 0
+    total_master = (m['Length'] * m['Width'] * 12) / 1000
+    total_block = sum((p[0] * m['Length'] * 12) / 1000 for p in block)
+    return total_master, total_block
+
+def _exact(x):
+    """`x` as an exact integer number of 2**-1074 units."""
+    n, d = float(x).as_integer_ratio()
+    return n << (_EXACT_BITS - d.bit_length() + 1)
+
+def _block_waste(total_master, total_block):
+    if total_block > 0:
+        return (abs(total_master - total_block) / total_block) * 100
+    return 0
+
+def _overall_waste(total_msi, total_prod):
     if total_prod == 0:
         return float('inf')
+    return (abs(total_msi - total_prod) / total_prod) * 100
+
+def init_waste_state(masters):
+    """
+    Build the state used by the incremental evaluation: per-block used width,
+    per-block (master_msi, block_msi) terms and the exact overall totals.
+    Like calculateWaste, this also refreshes m['Waste'] for every master.
+    """
+    state = {'used': [], 'terms': [], 'total_msi': 0, 'total_prod': 0}
+    for m in masters:
+        used_row, terms_row, block_wastes = [], [], []
+        for block in m['Products']:
+            total_master, total_block = _block_terms(m, block)
+            used_row.append(sum(p[0] for p in block))
+            terms_row.append((total_master, total_block))
+            block_wastes.append(_block_waste(total_master, total_block))
+            state['total_msi'] += _exact(total_master)
+            state['total_prod'] += _exact(total_block)
+        state['used'].append(used_row)
+        state['terms'].append(terms_row)
+        m['Waste'] = block_wastes
+    return state
+
+def state_waste(state):
+    """Overall waste percentage for the solution tracked by `state`."""
+    return _overall_waste(state['total_msi'] / _EXACT_UNIT, state['total_prod'] / _EXACT_UNIT)
 
-    overall_waste = (abs(total_msi - total_prod) / total_prod) * 100
-    return overall_waste
+def evaluate_move(masters, state, touched):
+    """
+    Overall waste after the blocks listed in `touched` ((master_idx, block_idx)
+    pairs, typically the donor and target of a move) have changed in `masters`.
+    Only the terms of those blocks are recomputed; `state` is left untouched.
+
+    Returns (waste, pending) where `pending` is handed to commit_move if the
+    move is accepted.
+    """
+    total_msi = state['total_msi']
+    total_prod = state['total_prod']
+    blocks = []
+    for mi, bi in dict.fromkeys(touched):
+        m = masters[mi]
+        old_master, old_block = state['terms'][mi][bi]
+        new_master, new_block = _block_terms(m, m['Products'][bi])
+        total_msi += _exact(new_master) - _exact(old_master)
+        total_prod += _exact(new_block) - _exact(old_block)
+        blocks.append((mi, bi, new_master, new_block))
+    pending = {'total_msi': total_msi, 'total_prod': total_prod, 'blocks': blocks}
+    return _overall_waste(total_msi / _EXACT_UNIT, total_prod / _EXACT_UNIT), pending
 
+def commit_move(masters, state, pending):
+    """
+    Fold an evaluated move into `state` and update m['Waste'] for the touched
+    blocks of `masters`.
+    """
+    for mi, bi, new_master, new_block in pending['blocks']:
+        m = masters[mi]
+        state['terms'][mi][bi] = (new_master, new_block)
+        state['used'][mi][bi] = sum(p[0] for p in m['Products'][bi])
+        m['Waste'][bi] = _block_waste(new_master, new_block)
+    state['total_msi'] = pending['total_msi']
+    state['total_prod'] = pending['total_prod']
 
 ########################################
 # Normal Best-Fit Initial Assignment
 ########################################
 def initialSolHeuristic(masters, products):
     products_sorted = sorted(products, key=lambda p: p[0], reverse=True)
+    # Index every block by its remaining width so each best-fit lookup is a binary search.
+    index = SlackIndex()
+    blocks = []
+    used = []
+    for m in masters:
+        for block in m['Products']:
+            used_width = sum(prod[0] for prod in block)
+            index.add(m['Width'] - used_width)
+            blocks.append((m, block))
+            used.append(used_width)
     for p in products_sorted:
         prodWidth, prodLength, _ = p
-        best_fit = None
-        best_slack = float('inf')
-        for m in masters:
-            for block in m['Products']:
-                used_width = sum(prod[0] for prod in block)
-                slack = m['Width'] - used_width - prodWidth
-                if slack >= 0 and slack < best_slack:
-                    best_slack = slack
-                    best_fit = block
+        best_fit = index.best_fit(prodWidth)
         if best_fit is not None:
-            best_fit.append(p)
+            m, block = blocks[best_fit]
+            block.append(p)
+            used[best_fit] += prodWidth
+            index.update(best_fit, m['Width'] - used[best_fit])
     return masters
 
 ########################################
@@ -75,40 +182,53 @@ def initialSolHeuristic(masters, products):
 def initialSolHeuristic_single(masters, products):
     """
     Try to assign each product to a master that currently has no products assigned.
-    If no such master is available, fall back to the normal best-fit assignment.
+    If no such master is available, fall back to the first block the product fits in.
+    Both lookups are first-fit queries on segment trees over the masters and blocks.
     """
     products_sorted = sorted(products, key=lambda p: p[0], reverse=True)
+    blocks = []
+    used = []
+    first_block = []
+    for mi, m in enumerate(masters):
+        first_block.append(len(blocks))
+        for block in m['Products']:
+            used_width = sum(prod[0] for prod in block)
+            blocks.append((mi, block))
+            used.append(used_width)
+    # Empty masters keyed on their width; masters with products are masked out.
+    empty_masters = FirstFitTree([
+        m['Width'] if m['Products'] and all(len(block) == 0 for block in m['Products']) else float('-inf')
+        for m in masters
+    ])
+    free_blocks = FirstFitTree([masters[mi]['Width'] - u for (mi, _), u in zip(blocks, used)])
     for p in products_sorted:
         prodWidth, prodLength, _ = p
-        assigned = False
         # First, try to assign to an empty master.
-        for m in masters:
-            if all(len(block) == 0 for block in m['Products']):
-                if m['Width'] >= prodWidth:
-                    m['Products'][0].append(p)
-                    assigned = True
-                    break
-        # If not assigned, fall back to best-fit.
-        if not assigned:
-            for m in masters:
-                for block in m['Products']:
-                    used_width = sum(prod[0] for prod in block)
-                    if (m['Width'] - used_width) >= prodWidth:
-                        block.append(p)
-                        assigned = True
-                        break
-                if assigned:
-                    break
-        if not assigned:
+        mi = empty_masters.find_first(prodWidth)
+        if mi is not None:
+            pos = first_block[mi]
+        else:
+            # If not assigned, fall back to the first block with enough room.
+            pos = free_blocks.find_first(prodWidth)
+        if pos is None:
             print("Unable to assign product in single mode:", p)
+            continue
+        mi, block = blocks[pos]
+        block.append(p)
+        used[pos] += prodWidth
+        free_blocks.update(pos, masters[mi]['Width'] - used[pos])
+        empty_masters.update(mi, float('-inf'))
     return masters
 
 ########################################
 # Compute Initial Solution
 ########################################
-def compute_initial_solution(inv_df, products, len_tol, useSingle=False):
-    unit_length = products[0][1]
-    masters = createMasterDict(inv_df=inv_df, prod_list_length=unit_length, len_tol=0.5)
+def sa_master_template(inv_df, products):
+    """Template of the empty blocks every SA restart starts from (see master_template)."""
+    return master_template(inv_df, prod_list_length=products[0][1], len_tol=0.5)
+
+def compute_initial_solution(template, products, len_tol, useSingle=False):
+    masters = masters_from_template(template)
     
     if useSingle:
         masters = initialSolHeuristic_single(masters, products)
@@ -119,104 +239,154 @@ def compute_initial_solution(inv_df, products, len_tol, useSingle=False):
     waste = calculateWaste(masters)
     return masters
 
+########################################
+# In-Place Moves
+########################################
+# A move is recorded as (product, (donor_mi, donor_bi, position), (target_mi, target_bi)):
+# the product taken from position `position` of the donor block and appended to the
+# target block. Recording the position lets undo_move restore the donor exactly.
+
+def apply_move(masters, move):
+    product, (donor_mi, donor_bi, pos), (target_mi, target_bi) = move
+    masters[donor_mi]['Products'][donor_bi].pop(pos)
+    masters[target_mi]['Products'][target_bi].append(product)
+
+def undo_move(masters, move):
+    product, (donor_mi, donor_bi, pos), (target_mi, target_bi) = move
+    masters[target_mi]['Products'][target_bi].pop()
+    masters[donor_mi]['Products'][donor_bi].insert(pos, product)
+
+def move_blocks(move):
+    """The (master_idx, block_idx) pairs changed by `move`."""
+    _, (donor_mi, donor_bi, _), (target_mi, target_bi) = move
+    return [(donor_mi, donor_bi), (target_mi, target_bi)]
+
+def snapshot_masters(masters):
+    """
+    Copy of `masters` that is independent of later in-place moves. Product tuples
+    are immutable, so only the dicts and lists need copying.
+    """
+    return [dict(m, Products=[list(block) for block in m['Products']], Waste=list(m['Waste']))
+            for m in masters]
+
 ########################################
 # Improved Perturbation with Simulated Annealing Options
 ########################################
-def perturb_solution(masters, lengthTol=0.1, waste_threshold=5, greedy_prob=0.1):
-    new_masters = copy.deepcopy(masters)
-    
-    # Build candidate list: each candidate is (master, block, block_waste)
+def perturb_solution(masters, state, lengthTol=0.1, waste_threshold=5, greedy_prob=0.1, rnd=None):
+    """
+    Pick a product to move from a donor block to a target block. Nothing is modified;
+    the move record is returned (None if no move is possible) and is applied with
+    apply_move. Block used widths are read from the incremental waste `state`.
+    Random draws come from `rnd` (a random.Random), or the `random` module.
+    """
+    rnd = rnd or random
+    # Build candidate list: each candidate is (master_idx, block_idx, block, block_waste)
     candidate_list = []
-    for m in new_masters:
-        for block, block_waste in zip(m['Products'], m['Waste']):
+    for mi, m in enumerate(masters):
+        for bi, (block, block_waste) in enumerate(zip(m['Products'], m['Waste'])):
             if block and block_waste >= waste_threshold:
-                candidate_list.append((m, block, block_waste))
+                candidate_list.append((mi, bi, block, block_waste))
     
     # Fallback: if no candidate meets threshold, use all non-empty blocks.
     if not candidate_list:
-        for m in new_masters:
-            for block, block_waste in zip(m['Products'], m['Waste']):
+        for mi, m in enumerate(masters):
+            for bi, (block, block_waste) in enumerate(zip(m['Products'], m['Waste'])):
                 if block:
-                    candidate_list.append((m, block, block_waste))
+                    candidate_list.append((mi, bi, block, block_waste))
     if not candidate_list:
-        return new_masters
+        return None
 
     # With probability greedy_prob, choose from blocks that have more than one product;
     # otherwise, choose randomly among candidates.
-    if random.random() < greedy_prob:
-        filtered = [cand for cand in candidate_list if len(cand[1]) > 1]
+    if rnd.random() < greedy_prob:
+        filtered = [cand for cand in candidate_list if len(cand[2]) > 1]
         if filtered:
-            donor_master, donor_block, donor_block_waste = max(filtered, key=lambda x: x[2])
+            donor_mi, donor_bi, donor_block, donor_block_waste = max(filtered, key=lambda x: x[3])
         else:
-            donor_master, donor_block, donor_block_waste = random.choice(candidate_list)
+            donor_mi, donor_bi, donor_block, donor_block_waste = rnd.choice(candidate_list)
     else:
-        donor_master, donor_block, donor_block_waste = random.choice(candidate_list)
+        donor_mi, donor_bi, donor_block, donor_block_waste = rnd.choice(candidate_list)
 
-    candidate_product = random.choice(donor_block)
-    donor_block.remove(candidate_product)
+    pos = rnd.randrange(len(donor_block))
+    candidate_product = donor_block[pos]
     prodWidth, prodLength, _ = candidate_product
 
     # Build target candidate list by treating each product block independently.
     target_candidates = []
-    for m in new_masters:
-        for block, block_waste in zip(m['Products'], m['Waste']):
-            if m is donor_master and block is donor_block:
+    fallback_candidates = []
+    for mi, m in enumerate(masters):
+        if abs(m['Length'] - prodLength) / m['Length'] > lengthTol:
+            continue
+        for bi, (used_width, block_waste) in enumerate(zip(state['used'][mi], m['Waste'])):
+            if mi == donor_mi and bi == donor_bi:
                 continue
-            used_width = sum(p[0] for p in block)
             available = m['Width'] - used_width
-            if available >= prodWidth and block_waste >= waste_threshold:
-                if abs(m['Length'] - prodLength) / m['Length'] <= lengthTol:
-                    target_candidates.append((m, block, block_waste))
-                    
-    if target_candidates:
-        target_master, target_block, _ = random.choice(target_candidates)
-        target_block.append(candidate_product)
-    else:
-        # Fallback: try any block where the product fits.
-        fallback_candidates = []
-        for m in new_masters:
-            for block in m['Products']:
-                if m is donor_master and block is donor_block:
-                    continue
-                used_width = sum(p[0] for p in block)
-                available = m['Width'] - used_width
-                if available >= prodWidth and abs(m['Length'] - prodLength) / m['Length'] <= lengthTol:
-                    fallback_candidates.append((m, block))
-        if fallback_candidates:
-            target_master, target_block = random.choice(fallback_candidates)
-            target_block.append(candidate_product)
-        else:
-            donor_block.append(candidate_product)
-            
-    #print(calculateWaste(masters))
-    #print_masters_table(masters)
-    return new_masters
-
-
+            if available >= prodWidth:
+                fallback_candidates.append((mi, bi))
+                if block_waste >= waste_threshold:
+                    target_candidates.append((mi, bi))
 
+    # Fallback: if no high-waste block can take it, try any block where the product fits.
+    if not target_candidates:
+        target_candidates = fallback_candidates
+    if not target_candidates:
+        return None
+    target_mi, target_bi = rnd.choice(target_candidates)
+    return (candidate_product, (donor_mi, donor_bi, pos), (target_mi, target_bi))
 
+########################################
+# Stopping Criteria
+########################################
+def chain_exhausted(i, last_improvement, deadline=None, stall_iterations=0,
+                    best_waste=None, target_waste=None):
+    """
+    True once the wall-clock `deadline` (a time.time() value) has passed, when
+    `stall_iterations` iterations have gone by since the last improvement, or when
+    `best_waste` has reached `target_waste` (the lower bound plus the gap target).
+    """
+    if stall_iterations and i - last_improvement >= stall_iterations:
+        return True
+    if target_waste is not None and best_waste is not None and best_waste <= target_waste:
+        return True
+    return deadline is not None and time.time() >= deadline
 
 ########################################
 # Simulated Annealing-Based Local Search
 ########################################
 def localSearch(masters, total_prod, iterations=1000, lengthTol=0.1,
-                initial_temp=1.2, cooling_rate=0.99):
-    current_solution = copy.deepcopy(masters)
-    current_waste = calculateWaste(current_solution)
-    best_solution = copy.deepcopy(current_solution)
+                initial_temp=1.2, cooling_rate=0.99, deadline=None, stall_iterations=0,
+                target_waste=None, rnd=None):
+    rnd = rnd or random
+    current_solution = snapshot_masters(masters)
+    state = init_waste_state(current_solution)
+    current_waste = state_waste(state)
+    best_solution = snapshot_masters(current_solution)
     best_waste = current_waste
+    last_improvement = 0
     temperature = initial_temp
 
     for i in range(iterations):
-        candidate = perturb_solution(current_solution, lengthTol)
-        candidate_waste = calculateWaste(candidate)
+        # Stop on the time budget, stagnation or the gap target; the best incumbent is returned.
+        if chain_exhausted(i, last_improvement, deadline, stall_iterations, best_waste, target_waste):
+            break
+        move = perturb_solution(current_solution, state, lengthTol, rnd=rnd)
+        if move is None:
+            temperature *= cooling_rate
+            continue
+        apply_move(current_solution, move)
+        # Only the donor and target blocks changed, so evaluate the move incrementally.
+        candidate_waste, pending = evaluate_move(current_solution, state, move_blocks(move))
         delta = candidate_waste - current_waste
-        if candidate_waste < best_waste:
-                best_solution = candidate
-                best_waste = candidate_waste
-        if delta < 0 or random.random() < math.exp(-delta / temperature):
-            current_solution = candidate
+        if delta < 0 or rnd.random() < math.exp(-delta / temperature):
+            commit_move(current_solution, state, pending)
             current_waste = candidate_waste
+            # Snapshot only when a new best is found.
+            if candidate_waste < best_waste:
+                best_solution = snapshot_masters(current_solution)
+                best_waste = candidate_waste
+                last_improvement = i
+        else:
+            undo_move(current_solution, move)
         temperature *= cooling_rate
     return best_solution, best_waste
 
@@ -224,12 +394,262 @@ def localSearch(masters, total_prod, iterations=1000, lengthTol=0.1,
 # Local Search Wrapper
 ########################################
 def local_search_solution(masters, total_msi, iterations=10000, lengthTol=0.1,
-                          initial_temp=1.0, cooling_rate=0.99):
+                          initial_temp=1.0, cooling_rate=0.99, batch_size=0, selection="boltzmann",
+                          deadline=None, stall_iterations=0, target_waste=None, rnd=None):
+    if batch_size > 0:
+        return localSearch_batched(masters, total_msi, iterations=iterations, lengthTol=lengthTol,
+                                   initial_temp=initial_temp, cooling_rate=cooling_rate,
+                                   batch_size=batch_size, selection=selection,
+                                   deadline=deadline, stall_iterations=stall_iterations,
+                                   target_waste=target_waste, rnd=rnd)
     best_masters, best_waste = localSearch(masters, total_msi, iterations=iterations, 
                                            lengthTol=lengthTol, initial_temp=initial_temp,
-                                           cooling_rate=cooling_rate)
+                                           cooling_rate=cooling_rate, deadline=deadline,
+                                           stall_iterations=stall_iterations,
+                                           target_waste=target_waste, rnd=rnd)
     return best_masters, best_waste
 
+########################################
+# Batched Vectorized Local Search
+########################################
+def localSearch_batched(masters, total_prod, iterations=1000, lengthTol=0.1,
+                        initial_temp=1.2, cooling_rate=0.99, batch_size=32, selection="boltzmann",
+                        deadline=None, stall_iterations=0, target_waste=None, waste_threshold=5,
+                        greedy_prob=0.1, rnd=None):
+    """
+    Simulated annealing on the CompactMasters arrays. Each step draws `batch_size`
+    candidate moves (product type, donor block, target block) at once, scores them
+    all with NumPy array operations on block slack and waste, then picks one:
+    the best candidate (selection="best") or one sampled by Boltzmann weight
+    (selection="boltzmann"). The picked move then goes through the usual
+    Metropolis test. Donors and targets are drawn the way perturb_solution
+    draws them (waste_threshold, greedy_prob). The NumPy generator and the
+    Metropolis test draw from `rnd` (a random.Random), or the `random` module.
+    Returns (best_masters, best_waste) in the dict format.
+    """
+    rnd = rnd or random
+    rng = np.random.default_rng(rnd.getrandbits(64))
+    compact = CompactMasters.from_masters(masters)
+    counts = compact.counts
+    type_width = compact.type_width
+    type_length = compact.type_length
+    W = compact.block_width()
+    L = compact.block_length()
+    num_blocks = compact.num_blocks
+    if num_blocks == 0 or len(type_width) == 0:
+        return masters, calculateWaste(masters)
+    # Length window of each (block, type) pair, looked up per candidate instead of recomputed.
+    in_window = CompatibilityIndex(W, L, type_width, type_length, len_tol=lengthTol, fallback=False).mask
+
+    # Per-block MSI of the master strip and MSI per unit of product width.
+    master_msi = (L * W * 12) / 1000
+    prod_factor = (L * 12) / 1000
+    nprod = counts.sum(axis=0)
+    used = type_width @ counts
+
+    def totals():
+        nonempty = nprod > 0
+        return master_msi[nonempty].sum(), (used * prod_factor).sum()
+
+    total_msi, total_prod = totals()
+    current_waste = _overall_waste(total_msi, total_prod)
+    best_counts = counts.copy()
+    best_waste = current_waste
+    last_improvement = 0
+    accepted = 0
+    temperature = initial_temp
+
+    for i in range(iterations):
+        if chain_exhausted(i, last_improvement, deadline, stall_iterations, best_waste, target_waste):
+            break
+        nonempty = nprod > 0
+        if not nonempty.any():
+            break
+        # As in perturb_solution, donors are the non-empty blocks whose waste is at
+        # least waste_threshold, or every non-empty block when none is.
+        block_prod = used * prod_factor
+        with np.errstate(divide='ignore', invalid='ignore'):
+            block_waste = np.where(nonempty, np.abs(master_msi - block_prod) / block_prod * 100, 0.0)
+        high_waste = nonempty & (block_waste >= waste_threshold)
+        donors = np.flatnonzero(high_waste)
+        if len(donors) == 0:
+            donors = np.flatnonzero(nonempty)
+        # Donor blocks, then a product type drawn in proportion to each donor's counts.
+        src = donors[rng.integers(0, len(donors), batch_size)]
+        # With probability greedy_prob, the donor is the worst block holding more than one product.
+        crowded = donors[nprod[donors] > 1]
+        if len(crowded):
+            greedy = rng.random(batch_size) < greedy_prob
+            src[greedy] = crowded[np.argmax(block_waste[crowded])]
+        cum = np.cumsum(counts[:, src], axis=0)
+        pick = rng.random(batch_size) * nprod[src]
+        types = (cum > pick).argmax(axis=0)
+        w = type_width[types]
+
+        # Targets: a random high-waste block the product fits in, or any block it
+        # fits in when no high-waste one does.
+        fit = ((W - used)[None, :] >= w[:, None]) & in_window[:, types].T
+        fit[np.arange(batch_size), src] = False
+        preferred = fit & high_waste[None, :]
+        fit = np.where(preferred.any(axis=1)[:, None], preferred, fit)
+        feasible = fit.any(axis=1)
+        dst = np.where(fit, rng.random(fit.shape), -1.0).argmax(axis=1)
+        if not feasible.any():
+            temperature *= cooling_rate
+            continue
+
+        # Waste of every candidate: only the donor and target terms change.
+        cand_msi = (total_msi
+                    - np.where(nprod[src] == 1, master_msi[src], 0.0)
+                    + np.where(nprod[dst] == 0, master_msi[dst], 0.0))
+        cand_prod = total_prod - w * prod_factor[src] + w * prod_factor[dst]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cand_waste = np.where(cand_prod > 0, np.abs(cand_msi - cand_prod) / cand_prod * 100, np.inf)
+        cand_waste = np.where(feasible, cand_waste, np.inf)
+
+        if selection == "boltzmann":
+            feasible_idx = np.flatnonzero(feasible)
+            scores = cand_waste[feasible_idx]
+            weights = np.exp(-(scores - scores.min()) / temperature)
+            k = feasible_idx[rng.choice(len(feasible_idx), p=weights / weights.sum())]
+        else:
+            k = int(np.argmin(cand_waste))
+
+        delta = cand_waste[k] - current_waste
+        if delta < 0 or rnd.random() < math.exp(-delta / temperature):
+            t, s, d = types[k], src[k], dst[k]
+            counts[t, s] -= 1
+            counts[t, d] += 1
+            nprod[s] -= 1
+            nprod[d] += 1
+            used[s] -= type_width[t]
+            used[d] += type_width[t]
+            total_msi, total_prod = cand_msi[k], cand_prod[k]
+            accepted += 1
+            if accepted % RESYNC_EVERY == 0:
+                used = type_width @ counts
+                total_msi, total_prod = totals()
+            current_waste = _overall_waste(total_msi, total_prod)
+            # Snapshot only when a new best is found.
+            if current_waste < best_waste:
+                best_counts = counts.copy()
+                best_waste = current_waste
+                last_improvement = i
+        temperature *= cooling_rate
+
+    compact.counts = best_counts
+    best_solution = compact.to_masters()
+    return best_solution, calculateWaste(best_solution)
+
+########################################
+# Parallel Restarts
+########################################
+# Instance data shared by every restart, set once per process by _init_restart_worker.
+_restart_args = None
+
+def resolve_workers(workers):
+    """Number of worker processes to use; 0 or less means one per CPU core."""
+    if workers is None or workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+def _init_restart_worker(template, products, total_msi, params):
+    global _restart_args
+    _restart_args = (template, products, total_msi, params)
+
+def run_restart(seed):
+    """
+    Run one independent SA chain (initial solution + local search) with its own
+    random.Random seeded with `seed`, leaving the process-wide `random` state
+    alone. Returns (masters, waste).
+    """
+    template, products, total_msi, params = _restart_args
+    rnd = random.Random(seed)
+    products_copy = products[:]  # Copy product list for this restart.
+    masters = compute_initial_solution(template, products_copy, params['len_tol'],
+                                       useSingle=params['useSingle'])
+    return local_search_solution(masters, total_msi,
+                                 iterations=params['iterations'], lengthTol=params['len_tol'],
+                                 initial_temp=1.0, cooling_rate=0.99,
+                                 batch_size=params['batch_size'], selection=params['selection'],
+                                 deadline=params['deadline'], stall_iterations=params['stall_iterations'],
+                                 target_waste=params['target_waste'], rnd=rnd)
+
+def run_restarts(filtered_inv, products, total_msi, num_restarts, iterations, len_tol,
+                 workers=1, useSingle=False, batch_size=0, selection="boltzmann",
+                 deadline=None, stall_iterations=0, stall_restarts=0,
+                 seed=None, is_canceled=None, target_waste=None, template=None):
+    """
+    Run `num_restarts` independent SA chains and yield (masters, waste) for each one
+    as it completes. With more than one worker, the chains run in a process pool.
+    If `is_canceled()` becomes true, outstanding workers are terminated and the
+    generator stops.
+
+    Chains stop at the wall-clock `deadline` (a time.time() value) or after
+    `stall_iterations` iterations without improvement, returning their best
+    incumbent. No further restarts are started once the deadline has passed or
+    `stall_restarts` consecutive restarts failed to improve on the best waste.
+    With a `target_waste` (the lower bound plus the gap target), chains stop and
+    no further restarts are started once a plan reaches it.
+
+    The blocks are laid out once, as the `template` from sa_master_template
+    (built from `filtered_inv` when not given), and each restart clones it.
+    """
+    if template is None:
+        template = sa_master_template(filtered_inv, products)
+    rng = random.Random(seed)
+    seeds = [rng.getrandbits(32) for _ in range(num_restarts)]
+    params = {'len_tol': len_tol, 'iterations': iterations, 'useSingle': useSingle,
+              'batch_size': batch_size, 'selection': selection,
+              'deadline': deadline, 'stall_iterations': stall_iterations,
+              'target_waste': target_waste}
+    workers = min(resolve_workers(workers), num_restarts)
+    best_waste = float('inf')
+    stalled = 0
+
+    def finished(result):
+        nonlocal best_waste, stalled
+        if result[1] < best_waste:
+            best_waste = result[1]
+            stalled = 0
+        else:
+            stalled += 1
+        return ((stall_restarts and stalled >= stall_restarts)
+                or (target_waste is not None and best_waste <= target_waste)
+                or (deadline is not None and time.time() >= deadline))
+
+    if workers <= 1:
+        _init_restart_worker(template, products, total_msi, params)
+        for s in seeds:
+            if is_canceled and is_canceled():
+                return
+            result = run_restart(s)
+            yield result
+            if finished(result):
+                return
+        return
+
+    pool = multiprocessing.Pool(workers, initializer=_init_restart_worker,
+                                initargs=(template, products, total_msi, params))
+    try:
+        results = pool.imap_unordered(run_restart, seeds)
+        for _ in range(num_restarts):
+            while True:
+                if is_canceled and is_canceled():
+                    return
+                try:
+                    result = results.next(timeout=0.1)
+                    break
+                except multiprocessing.TimeoutError:
+                    continue
+            yield result
+            if finished(result):
+                return
+    finally:
+        # Also reached on cancel or when the caller stops iterating early.
+        pool.terminate()
+        pool.join()
+
 ########################################
 # Main Solve Function (SA-based)
 ########################################
@@ -238,7 +658,13 @@ def solve(inv_df, po_df, selected_pos, label_code,
           rem_tol=0.15,
           len_tol=0.1,
           num_restarts=100,
-          iterations=1000):
+          iterations=1000,
+          useSingle=False,
+          workers=0,
+          batch_size=0,
+          time_limit=0,
+          stall_iterations=0,
+          stall_restarts=0):
     products, total_msi = process_selected_pos(selected_pos)
     original_product_count = len(products)
     filtered_inv = filter_inventory(inv_df, label_code)
@@ -246,19 +672,21 @@ def solve(inv_df, po_df, selected_pos, label_code,
     best_overall_waste = float('inf')
     best_overall_masters = None
 
-    progress_bar = tqdm(range(num_restarts), 
+    progress_bar = tqdm(total=num_restarts, 
                         desc=f"Restart iterations | Best Waste: {best_overall_waste:.2f}%")
     
-    for restart in progress_bar:
-        products_copy = products[:]  # Copy product list for this restart.
-        masters = compute_initial_solution(filtered_inv, products_copy, len_tol, useSingle=useSingle)
-        candidate_masters, candidate_waste = local_search_solution(masters, total_msi, 
-                                                                   iterations=iterations, lengthTol=len_tol,
-                                                                   initial_temp=1.0, cooling_rate=0.99)
+    deadline = time.time() + time_limit if time_limit > 0 else None
+    restarts = run_restarts(filtered_inv, products, total_msi, num_restarts, iterations, len_tol,
+                            workers=workers, useSingle=useSingle, batch_size=batch_size,
+                            deadline=deadline, stall_iterations=stall_iterations,
+                            stall_restarts=stall_restarts)
+    for restart, (candidate_masters, candidate_waste) in enumerate(restarts):
         if candidate_waste < best_overall_waste:
             best_overall_waste = candidate_waste
             best_overall_masters = candidate_masters
+        progress_bar.update(1)
         progress_bar.set_description(f"Restart {restart+1}/{num_restarts} | Best Waste: {best_overall_waste:.2f}%")
+    progress_bar.close()
     
     if best_overall_masters is None or not is_valid_solution(best_overall_masters, original_product_count):
         print("No solution found using current number of Products")
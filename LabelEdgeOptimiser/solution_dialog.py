@@ -4,7 +4,7 @@ import pandas as pd
 import simulated_annealing as sa
 
 class SolutionDialog(QtWidgets.QDialog):
-    def __init__(self, masters, parent=None):
+    def __init__(self, masters, parent=None, info=None):
         super().__init__(parent)
         self.setWindowTitle("Solution")
         self.resize(800, 600)
@@ -15,6 +15,19 @@ class SolutionDialog(QtWidgets.QDialog):
         waste_label.setFont(QtGui.QFont("Arial", 12))
         layout.addWidget(waste_label)
         
+        info = info or {}
+        if info.get('waste_bound') is not None:
+            bound_label = QtWidgets.QLabel(
+                f"Lower Bound: {info['waste_bound']:.2f}% (gap {overall_waste - info['waste_bound']:.2f} points)")
+            bound_label.setFont(QtGui.QFont("Arial", 12))
+            layout.addWidget(bound_label)
+        
+        # Engine that produced the plan, when the solve raced several (PORTFOLIO).
+        if info.get('engine') is not None:
+            engine_label = QtWidgets.QLabel(f"Plan by {info['engine']} in {info['engine_seconds']:.2f}s")
+            engine_label.setFont(QtGui.QFont("Arial", 12))
+            layout.addWidget(engine_label)
+        
         df = self.build_dataframe(masters)
         table = QtWidgets.QTableWidget()
         table.setRowCount(df.shape[0])
@@ -1,28 +1,49 @@
 # solve_worker.py
 import traceback
 from PyQt5 import QtCore
-from simulated_annealing import (
-    process_selected_pos,
-    filter_inventory,
-    compute_initial_solution,
-    local_search_solution,
-    is_valid_solution,
-    createMasterDict,
-)
-from milp import optimize_assignment  # Import the MILP optimization function
-from column_gen import optimize_assignment_column_generation  # Import the Column Generation optimization function
+from simulated_annealing import process_selected_pos, is_valid_solution
+from pipeline import solve_instance  # Headless solve shared with the benchmarks
+from profiling import PhaseTimer, profile_solve
 
 class SolveWorker(QtCore.QObject):
     progressChanged = QtCore.pyqtSignal(int)
     finished = QtCore.pyqtSignal(object)
     errorOccurred = QtCore.pyqtSignal(str)
+    timingsReported = QtCore.pyqtSignal(object)  # {'spans': [...]} from PhaseTimer.as_dict()
+    solveInfoReported = QtCore.pyqtSignal(object)  # solver statistics, e.g. MILP gap or winning engine
     
-    def __init__(self, inv_df, po_df, selected_pos, label_code, util_tol, rem_tol, len_tol, num_restarts, iterations, algorithm="SA"):
+    def __init__(self, inv_df, po_df, selected_pos, label_code, util_tol, rem_tol, len_tol, num_restarts, iterations, algorithm="SA", options=None):
         """
         Parameters:
           - algorithm: A string flag to choose the optimization method.
                        "SA" for Simulated Annealing (default), "MILP" for MILP optimization,
-                       or "COLGEN" for a column generation based approach.
+                       "COLGEN" for a per-block knapsack approach, "GILMORE_GOMORY"
+                       for column generation with dual-priced pricing, or "PORTFOLIO"
+                       to race several of them and keep the best plan.
+          - options: Optional dict of solver settings from the [Optimization] config section:
+                       "workers": number of processes for SA restarts (0 = one per core).
+                       "sa_batch_size": candidate moves scored per SA step (0 = one move per step).
+                       "sa_batch_selection": "best" or "boltzmann" pick among a batch.
+                       "time_limit": wall-clock budget in seconds for the whole solve (0 = none).
+                       "stall_iterations": stop an SA chain after this many iterations
+                                           without improvement (0 = never).
+                       "stall_restarts": stop starting SA restarts after this many
+                                         restarts without improvement (0 = never).
+                       "sa_gap_target": stop SA once its waste is within this many points
+                                        of the instance's waste lower bound (0 = off).
+                       "milp_gap_rel": relative gap at which the MILP stops (0 = prove optimality).
+                       "milp_threads": CBC threads for the MILP (0 = CBC default).
+                       "milp_warm_start": start the MILP from the best-fit heuristic (default True).
+                       "backend": solver for the MILP and Gilmore-Gomory master problems:
+                                  "auto" (default), "highs", "scipy" or "pulp".
+                       "decompose_by_paper": solve each selected paper on its own rolls,
+                                             in parallel workers (default True).
+                       "portfolio_engines": comma-separated engines raced by PORTFOLIO
+                                            (default "SA,MILP,COLGEN,GILMORE_GOMORY").
+                       "trace_file": if set, the phase timings are also written there as JSON.
+                       "profile": run the solve under cProfile/tracemalloc and dump the
+                                  results into "profile_dir" (default "profiles"; the GUI
+                                  resolves it next to the config file).
         """
         super().__init__()
         self.inv_df = inv_df
@@ -34,66 +55,64 @@ class SolveWorker(QtCore.QObject):
         self.len_tol = len_tol
         self.num_restarts = num_restarts
         self.iterations = iterations
-        self.algorithm = algorithm  # "SA", "MILP", or "COLGEN"
+        self.algorithm = algorithm  # "SA", "MILP", "COLGEN", "GILMORE_GOMORY" or "PORTFOLIO"
+        self.options = options or {}
         self._isCanceled = False
+        self.info = {}
         
     def cancel(self):
         self._isCanceled = True
         
     def run(self):
+        timer = PhaseTimer()
+        result = None
         try:
-            best_overall_waste = float('inf')
-            best_overall_masters = None
-            products, total_msi = process_selected_pos(self.selected_pos)
-            
-            keys = ['Paper', 'Width', 'Length', 'Nb', 'msi']
-            products_dict = [dict(zip(keys, item.split('/'))) for item in self.selected_pos]
-            
-            original_product_count = len(products)
-            filtered_inv = filter_inventory(self.inv_df, self.label_code)
-            
-            initial_masters = createMasterDict(inv_df= filtered_inv, prod_list_length=products[0][1])
-            
-            print("Algorithm:", self.algorithm)
-            # Switch between optimization methods based on the algorithm flag.
-            if self.algorithm.upper() == "MILP":
-                
-                masters = optimize_assignment(initial_masters, products_dict)
-                self.progressChanged.emit(100)
-                best_overall_masters = masters
-            elif self.algorithm.upper() == "COLGEN":
-                # Column Generation branch: use the column generation routine.
-                masters = compute_initial_solution(filtered_inv, products, self.len_tol)
-                masters = optimize_assignment_column_generation(initial_masters, products_dict)
-                self.progressChanged.emit(100)
-                best_overall_masters = masters
-            else:
-                # Simulated Annealing branch
-                for restart in range(self.num_restarts):
-                    if self._isCanceled:
-                        self.finished.emit(None)
-                        return
-                    products_copy = products[:]  # make a copy of the products list
-                    masters = compute_initial_solution(filtered_inv, products_copy, self.len_tol)
-                    candidate_masters, candidate_waste = local_search_solution(
-                        masters,
-                        total_msi,
-                        iterations=self.iterations,
-                        lengthTol=self.len_tol,
-                        initial_temp=1.0,
-                        cooling_rate=0.99,
-                    )
-                    if candidate_waste < best_overall_waste:
-                        best_overall_waste = candidate_waste
-                        best_overall_masters = candidate_masters
-                    progress_percent = int(100 * (restart + 1) / self.num_restarts)
-                    self.progressChanged.emit(progress_percent)
-            
-            if best_overall_masters is None or not is_valid_solution(best_overall_masters, original_product_count):
-                self.errorOccurred.emit("No solution found using current number of Products")
-                self.finished.emit(None)
-            else:
-                self.finished.emit(best_overall_masters)
+            with profile_solve(self.options.get("profile", False),
+                               self.options.get("profile_dir", "profiles")):
+                with timer.span("solve_worker.run"):
+                    result = self._run(timer)
         except Exception:
             self.errorOccurred.emit(traceback.format_exc())
-            self.finished.emit(None)
+        # Timings are reported first so they are available when the result arrives.
+        self.report_timings(timer)
+        if self.info:
+            self.solveInfoReported.emit(self.info)
+        self.finished.emit(result)
+    
+    def _run(self, timer):
+        products, _ = process_selected_pos(self.selected_pos)
+        original_product_count = len(products)
+        
+        best_overall_masters = solve_instance(
+            self.inv_df,
+            self.selected_pos,
+            self.label_code,
+            algorithm=self.algorithm,
+            len_tol=self.len_tol,
+            num_restarts=self.num_restarts,
+            iterations=self.iterations,
+            options=self.options,
+            progress=self.progressChanged.emit,
+            is_canceled=lambda: self._isCanceled,
+            timer=timer,
+            info=self.info,
+        )
+        if self._isCanceled:
+            return None
+        
+        with timer.span("validate"):
+            valid = best_overall_masters is not None and is_valid_solution(best_overall_masters, original_product_count)
+        if not valid:
+            self.errorOccurred.emit("No solution found using current number of Products")
+            return None
+        return best_overall_masters
+    
+    def report_timings(self, timer):
+        print("Solve timings:\n" + timer.summary())
+        self.timingsReported.emit(timer.as_dict())
+        trace_file = self.options.get("trace_file")
+        if trace_file:
+            try:
+                timer.write_json(trace_file)
+            except OSError as e:
+                print(f"Could not write timing trace: {e}")
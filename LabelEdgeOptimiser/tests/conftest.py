@@ -0,0 +1,4 @@
+import os, sys
+
+# The application modules are flat files next to this folder, imported by name.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,26 @@
+from collections import Counter
+from column_gen import optimize_assignment_gilmore_gomory
+
+def _master(code, width, length, num_blocks):
+    return {'Code': code, 'Width': width, 'Length': length,
+            'Products': [[] for _ in range(num_blocks)], 'Waste': [0] * num_blocks}
+
+def test_same_width_different_length_stay_separate():
+    """
+    Two order lines share a width but not a length. Each product goes to a
+    block whose length is within the window, and the plan hands back the
+    original product tuples rather than one tuple per width.
+    """
+    short = (4.0, 5000.0, 4.0 * 5 * 12)
+    long = (4.0, 10000.0, 4.0 * 10 * 12)
+    products = [short] * 4 + [long] * 2
+    masters = [_master("SHORT", 8.0, 5000.0, 2), _master("LONG", 8.0, 10000.0, 1)]
+
+    masters = optimize_assignment_gilmore_gomory(masters, products, len_tol=0.1)
+
+    placed = [p for m in masters for block in m['Products'] for p in block]
+    assert Counter(placed) == Counter(products)
+    for m in masters:
+        for block in m['Products']:
+            for _, length, _ in block:
+                assert abs(m['Length'] - length) / m['Length'] <= 0.1
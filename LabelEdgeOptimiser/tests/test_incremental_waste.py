@@ -0,0 +1,44 @@
+import random
+from utils import process_selected_pos
+from simulated_annealing import (calculateWaste, init_waste_state, state_waste, evaluate_move,
+                                 commit_move, perturb_solution, apply_move, undo_move,
+                                 move_blocks, snapshot_masters, sa_master_template,
+                                 compute_initial_solution)
+from benchmarks.generators import synthetic_instance
+
+def _initial_solution(n_products, seed):
+    inv_df, selected_pos = synthetic_instance(n_products, seed=seed)
+    products, _ = process_selected_pos(selected_pos)
+    template = sa_master_template(inv_df, products)
+    return compute_initial_solution(template, products, 0.5)
+
+def test_incremental_waste_matches_full_recomputation():
+    """
+    Every move evaluated incrementally scores exactly what calculateWaste gives
+    for the same solution, whether the move is then committed or undone.
+    """
+    random.seed(0)
+    masters = _initial_solution(500, seed=0)
+    state = init_waste_state(masters)
+    assert state_waste(state) == calculateWaste(snapshot_masters(masters))
+
+    moves = 0
+    for _ in range(5000):
+        move = perturb_solution(masters, state, lengthTol=0.5)
+        if move is None:
+            continue
+        apply_move(masters, move)
+        waste, pending = evaluate_move(masters, state, move_blocks(move))
+        assert waste == calculateWaste(snapshot_masters(masters))
+        if random.random() < 0.5:
+            commit_move(masters, state, pending)
+            moves += 1
+        else:
+            undo_move(masters, move)
+        assert state_waste(state) == calculateWaste(snapshot_masters(masters))
+    assert moves > 0
+
+    # m['Waste'] is kept up to date for the blocks each committed move touched.
+    block_wastes = [list(m['Waste']) for m in masters]
+    calculateWaste(masters)
+    assert block_wastes == [m['Waste'] for m in masters]
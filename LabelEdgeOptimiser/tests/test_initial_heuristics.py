@@ -0,0 +1,69 @@
+import pytest
+from benchmarks.generators import synthetic_instance
+from utils import process_selected_pos
+from simulated_annealing import (initialSolHeuristic, initialSolHeuristic_single,
+                                 sa_master_template, masters_from_template)
+
+def _baseline_best_fit(masters, products):
+    """initialSolHeuristic before the capacity index: a linear scan per product."""
+    products_sorted = sorted(products, key=lambda p: p[0], reverse=True)
+    for p in products_sorted:
+        prodWidth, prodLength, _ = p
+        best_fit = None
+        best_slack = float('inf')
+        for m in masters:
+            for block in m['Products']:
+                used_width = sum(prod[0] for prod in block)
+                slack = m['Width'] - used_width - prodWidth
+                if slack >= 0 and slack < best_slack:
+                    best_slack = slack
+                    best_fit = block
+        if best_fit is not None:
+            best_fit.append(p)
+    return masters
+
+def _baseline_single(masters, products):
+    """initialSolHeuristic_single before the capacity index."""
+    products_sorted = sorted(products, key=lambda p: p[0], reverse=True)
+    for p in products_sorted:
+        prodWidth, prodLength, _ = p
+        assigned = False
+        for m in masters:
+            if all(len(block) == 0 for block in m['Products']):
+                if m['Width'] >= prodWidth:
+                    m['Products'][0].append(p)
+                    assigned = True
+                    break
+        if not assigned:
+            for m in masters:
+                for block in m['Products']:
+                    used_width = sum(prod[0] for prod in block)
+                    if (m['Width'] - used_width) >= prodWidth:
+                        block.append(p)
+                        assigned = True
+                        break
+                if assigned:
+                    break
+    return masters
+
+def _template(n_products, seed, slack):
+    inv_df, selected_pos = synthetic_instance(n_products, seed=seed, slack=slack)
+    products, _ = process_selected_pos(selected_pos)
+    return sa_master_template(inv_df, products), products
+
+# slack < 1 leaves some products without a block.
+CASES = [(50, 0, 1.3), (200, 1, 1.3), (500, 2, 1.1), (300, 3, 0.8)]
+
+@pytest.mark.parametrize("n_products, seed, slack", CASES)
+def test_best_fit_matches_baseline(n_products, seed, slack):
+    template, products = _template(n_products, seed, slack)
+    expected = _baseline_best_fit(masters_from_template(template), products)
+    result = initialSolHeuristic(masters_from_template(template), products)
+    assert [m['Products'] for m in result] == [m['Products'] for m in expected]
+
+@pytest.mark.parametrize("n_products, seed, slack", CASES)
+def test_single_matches_baseline(n_products, seed, slack):
+    template, products = _template(n_products, seed, slack)
+    expected = _baseline_single(masters_from_template(template), products)
+    result = initialSolHeuristic_single(masters_from_template(template), products)
+    assert [m['Products'] for m in result] == [m['Products'] for m in expected]
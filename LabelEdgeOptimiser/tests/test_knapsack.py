@@ -0,0 +1,50 @@
+import itertools
+import random
+import pytest
+from knapsack import bounded_knapsack, PatternCache
+
+def _brute_force(capacity, widths, values, bounds):
+    """Best value over every pattern within the bounds that fits the capacity."""
+    best = 0.0
+    for pattern in itertools.product(*(range(b + 1) for b in bounds)):
+        if sum(w * a for w, a in zip(widths, pattern)) <= capacity + 1e-9:
+            best = max(best, sum(v * a for v, a in zip(values, pattern)))
+    return best
+
+def _instances(count, seed):
+    rnd = random.Random(seed)
+    for _ in range(count):
+        n = rnd.randint(1, 4)
+        widths = [round(rnd.uniform(0.5, 5.5), 3) for _ in range(n)]
+        bounds = [rnd.randint(0, 4) for _ in range(n)]
+        capacity = rnd.choice([6.5, 8.0, 9.75, 10.0, 12.25, 13.0, 16.0])
+        yield capacity, widths, bounds, rnd
+
+@pytest.mark.parametrize("seed", range(3))
+def test_width_knapsack_is_optimal(seed):
+    # The column_gen block knapsack: values are the widths.
+    for capacity, widths, bounds, _ in _instances(100, seed):
+        pattern, value = bounded_knapsack(capacity, widths, widths, bounds)
+        assert all(0 <= a <= b for a, b in zip(pattern, bounds))
+        assert sum(w * a for w, a in zip(widths, pattern)) <= capacity + 1e-9
+        assert value == pytest.approx(_brute_force(capacity, widths, widths, bounds))
+
+@pytest.mark.parametrize("seed", range(3))
+def test_priced_knapsack_is_optimal(seed):
+    # The Gilmore–Gomory pricing knapsack: values are arbitrary, some non-positive.
+    for capacity, widths, bounds, rnd in _instances(100, seed + 10):
+        values = [round(rnd.uniform(-2, 10), 3) for _ in widths]
+        pattern, value = bounded_knapsack(capacity, widths, values, bounds)
+        assert sum(w * a for w, a in zip(widths, pattern)) <= capacity + 1e-9
+        assert value == pytest.approx(_brute_force(capacity, widths, values, bounds))
+
+def test_pattern_cache_matches_direct_solves():
+    rnd = random.Random(7)
+    widths = [3.25, 2.5, 1.75, 1.125]
+    cache = PatternCache(widths, maxsize=8)
+    for _ in range(300):
+        capacity = rnd.choice([6.5, 8.0, 10.0])
+        bounds = [rnd.randint(0, 4) for _ in widths]
+        _, value = cache.solve(capacity, bounds)
+        assert value == pytest.approx(bounded_knapsack(capacity, widths, widths, bounds)[1])
+    assert cache.hits + cache.dominated_hits > 0
@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+from benchmarks.generators import synthetic_inventory
+from utils import createMasterDict, master_template, masters_from_template
+
+def _baseline_master_dict(inv_df, prod_list_length, len_tol=0.1):
+    """createMasterDict before vectorizing: one iterrows pass over the inventory."""
+    masterDict = []
+    for index, row in inv_df.iterrows():
+        code = row['Roll ID']
+        width = float(row['Larg.'])
+        master_length = float(row['Longueur'])
+        base_count = int(master_length // prod_list_length)
+        remainder = master_length - (base_count * prod_list_length)
+        if (remainder / prod_list_length) >= (1 - len_tol):
+            num_lists = base_count + 1
+        else:
+            num_lists = base_count
+        if num_lists < 1:
+            num_lists = 1
+        allocated_length = master_length / num_lists
+        masterDict.append({
+            'Code': code,
+            'Width': width,
+            'Length': allocated_length,
+            'Products': [[] for _ in range(num_lists)],
+            'Waste': []
+        })
+    return masterDict
+
+def _edge_inventory():
+    """Rolls shorter than a product list, exact multiples and remainders on the tolerance edge."""
+    lengths = [1000.0, 4999.0, 5000.0, 9499.0, 9500.0, 10000.0, 14500.0, 3333.3, 12345.6]
+    return pd.DataFrame({
+        'Roll ID': [f"EDGE{i}" for i in range(len(lengths))],
+        'Code LabelEdge': "P1",
+        'Larg.': [6.5 + i for i in range(len(lengths))],
+        'Longueur': lengths,
+    })
+
+@pytest.mark.parametrize("prod_list_length", [5000.0, 3000.0, 7500.0])
+@pytest.mark.parametrize("len_tol", [0.1, 0.5, 0.0])
+def test_template_matches_baseline(prod_list_length, len_tol):
+    for inv_df in (synthetic_inventory(200, seed=4), _edge_inventory()):
+        expected = _baseline_master_dict(inv_df, prod_list_length, len_tol)
+        assert masters_from_template(master_template(inv_df, prod_list_length, len_tol)) == expected
+        assert createMasterDict(inv_df, prod_list_length, len_tol) == expected
+
+def test_masters_from_template_are_independent():
+    template = master_template(_edge_inventory(), 5000.0)
+    first = masters_from_template(template)
+    first[0]['Products'][0].append((1.0, 5000.0, 60.0))
+    assert masters_from_template(template)[0]['Products'][0] == []
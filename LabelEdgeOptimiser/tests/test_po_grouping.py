@@ -0,0 +1,39 @@
+import math
+import pandas as pd
+import pytest
+from benchmarks.generators import synthetic_po_sheet, synthetic_product_groups
+from benchmarks.po_grouping import rowwise_filter_po_df, rowwise_process_groups
+from fileInput import filter_po_df, process_groups
+
+@pytest.mark.parametrize("n_lines, seed", [(10, 0), (50, 1), (2000, 2)])
+def test_filter_po_df_matches_rowwise(n_lines, seed):
+    po_df = synthetic_po_sheet(n_lines, seed=seed)
+    for start_row in (1, max(1, n_lines // 8)):
+        expected = rowwise_filter_po_df(po_df, start_row)
+        result = filter_po_df(po_df, start_row)
+        pd.testing.assert_frame_equal(result.reset_index(drop=True), expected.reset_index(drop=True))
+
+@pytest.mark.parametrize("n_rows, n_groups, seed", [(1, 1, 0), (40, 5, 1), (300, 40, 2)])
+def test_process_groups_matches_rowwise(n_rows, n_groups, seed):
+    df = synthetic_product_groups(n_rows, n_groups, seed=seed)
+    start_column = df.columns[1]
+    pd.testing.assert_frame_equal(process_groups(df, start_column),
+                                  rowwise_process_groups(df, start_column))
+
+def test_process_groups_skips_invalid_products():
+    # Each group's columns 2-4 join into one of the strings counted as no product.
+    nan = math.nan
+    df = pd.DataFrame({
+        "Notre # comm": [1, 2],
+        "G1.1": ["a", "b"], "G1.2": [nan, "//0"], "G1.3": [nan, nan], "G1.4": [nan, nan],
+        "G2.1": ["a", "b"], "G2.2": ["//0", "P1/2.5/5"], "G2.3": [nan, 10], "G2.4": ["0.0", 150.0],
+        "G3.1": ["a", "b"], "G3.2": ["", ""], "G3.3": ["", ""], "G3.4": ["nan/nan", "P1/1/5"],
+    })
+    expected = rowwise_process_groups(df, "G1.1")
+    result = process_groups(df, "G1.1")
+    pd.testing.assert_frame_equal(result, expected)
+    assert result["num_products"].tolist() == [0, 2]
+
+def test_process_groups_without_groups():
+    df = pd.DataFrame({"Notre # comm": [1, 2], "Extra": ["x", "y"]})
+    pd.testing.assert_frame_equal(process_groups(df, "Extra"), rowwise_process_groups(df, "Extra"))
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 def print_masters_table(masters):
@@ -27,60 +28,80 @@ def print_masters_table(masters):
     print(df.to_string(index=False))
 
 
-def createProductBlocks(po_df, selected_pos):
-    
-    numbers = [p.split(' ')[0] for p in selected_pos]
-    
-    # Create a lookup dictionary for quick mapping from PO_Number to Products string.
-    lookup = {str(row['PO_Number']): row['Products'] for _, row in po_df.iterrows()}
-    
+def build_po_index(po_df):
+    """
+    PO_Number (as a string) -> list of its "Code/Qty/msi" product strings, in
+    the order of `po_df`. Built once when the PO sheet is loaded, so selecting
+    orders only looks up the selected numbers.
+    """
+    if po_df.empty:
+        return {}
+    numbers = po_df['PO_Number'].astype(str)
+    products = [[p.strip() for p in product_str.split(',') if p.strip()] if product_str else []
+                for product_str in po_df['Products']]
+    return dict(zip(numbers, products))
+
+def createProductBlocks(po_index, selected_pos):
+    """
+    Product strings of the selected orders, looked up in the index from
+    build_po_index. `selected_pos` entries start with the PO number, as in the
+    "PO_Number Client Order_Number" labels of the order dialog.
+    """
     product_blocks = []
-    for num in numbers:
-        product_str = lookup.get(num, '')
-        if product_str:
-            # Split product_str by comma, trim whitespace, and filter out empty strings.
-            products = [p.strip() for p in product_str.split(',') if p.strip()]
-            product_blocks.extend(products)
+    for p in selected_pos:
+        product_blocks.extend(po_index.get(p.split(' ')[0], []))
     
     return product_blocks
 
+def master_template(inv_df, prod_list_length, len_tol=0.1):
+    """
+    Block layout of every inventory roll, computed over the whole DataFrame at
+    once: a tuple of (code, width, allocated_length, num_lists) tuples in
+    inventory order. Each roll holds as many full product lists as fit its
+    length, plus one more if the remainder is within `len_tol` of a full list,
+    and at least one. The allocated length is the roll length split evenly
+    over its lists.
+
+    The template is immutable, so it can be built once per solve and turned
+    into fresh masters with masters_from_template as often as needed.
+    """
+    lengths = inv_df['Longueur'].to_numpy(dtype=float)
+    base_count = np.floor_divide(lengths, prod_list_length)
+    remainder = lengths - base_count * prod_list_length
+    # If the remainder is within tolerance of a full unit, add an extra list.
+    num_lists = base_count + (remainder / prod_list_length >= 1 - len_tol)
+    num_lists = np.maximum(num_lists, 1).astype(int)
+    allocated_length = lengths / num_lists
+    return tuple(zip(inv_df['Roll ID'].tolist(),
+                     inv_df['Larg.'].to_numpy(dtype=float).tolist(),
+                     allocated_length.tolist(),
+                     num_lists.tolist()))
+
+def masters_from_template(template):
+    """Fresh masters with empty product lists, one per roll of `template`."""
+    return [{
+        'Code': code,
+        'Width': width,
+        'Length': allocated_length,
+        'Products': [[] for _ in range(num_lists)],  # Create a list of empty product lists.
+        'Waste': []
+    } for code, width, allocated_length, num_lists in template]
+
 def createMasterDict(inv_df, prod_list_length, len_tol=0.1):
-    masterDict = []
-    
-    for index, row in inv_df.iterrows():
-        code = row['Roll ID']
-        width = float(row['Larg.'])
-        master_length = float(row['Longueur'])
-        
-        # Calculate how many full product lists fit into the master length.
-        base_count = int(master_length // prod_list_length)
-        remainder = master_length - (base_count * prod_list_length)
-        
-        # If the remainder is within tolerance of a full unit, add an extra list.
-        if (remainder / prod_list_length) >= (1 - len_tol):
-            num_lists = base_count + 1
-        else:
-            num_lists = base_count
-        
-        # Ensure at least one product list is created.
-        if num_lists < 1:
-            num_lists = 1
-        
-        # Calculate allocated length per product list.
-        allocated_length = master_length / num_lists
-        
-        tempDict = {
-            'Code': code,
-            'Width': width,
-            'Length': allocated_length,
-            'Products': [[] for _ in range(num_lists)],  # Create a list of empty product lists.
-            'Waste': []
-        }
-        masterDict.append(tempDict)
-        
-    #print(masterDict)
-    
-    return masterDict
+    return masters_from_template(master_template(inv_df, prod_list_length, len_tol=len_tol))
+
+def block_classes(masters):
+    """
+    Group interchangeable blocks: {(Width, Length): [(master_idx, block_idx), ...]} in
+    master order. createMasterDict gives every block of a roll the same allocated
+    length, and inventory often holds several rolls of the same width and length.
+    """
+    classes = {}
+    for m_idx, master in enumerate(masters):
+        key = (float(master['Width']), float(master['Length']))
+        for b_idx in range(len(master['Products'])):
+            classes.setdefault(key, []).append((m_idx, b_idx))
+    return classes
 
 def process_selected_pos(selected_pos):
     """